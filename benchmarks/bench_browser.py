@@ -0,0 +1,48 @@
+"""
+    Page load time and browser memory per browser mode.
+
+    Launches Firefox in each mode, loads ``url`` a few times and reports the
+    median load time and the resident memory afterwards; needs Firefox and
+    geckodriver, and an X display unless --headless is given::
+
+        python benchmarks/bench_browser.py --headless -n 5 https://www.heb.com/
+"""
+
+import argparse
+import statistics
+import time
+
+from farquaad.base import browser
+from farquaad.base.drivers import processRss
+
+
+def measure(mode, url, loads, headless):
+    driver = browser.firefox(mode, headless=headless)
+    try:
+        times = []
+        for _ in range(loads):
+            driver.delete_all_cookies()
+            started = time.perf_counter()
+            driver.get(url)
+            times.append(time.perf_counter() - started)
+        return statistics.median(times), processRss(driver)
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("-n", "--loads", type=int, default=5)
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{args.url}, median of {args.loads} loads")
+    for mode in browser.MODES:
+        load, rss = measure(mode, args.url, args.loads, args.headless)
+        memory = f"{rss:7.0f} MB" if rss is not None else "      ? MB"
+        print(f"  {mode:9} {load * 1000:9.0f} ms  {memory}")
+
+
+if __name__ == "__main__":
+    main()
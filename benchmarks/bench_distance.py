@@ -0,0 +1,59 @@
+"""
+    Micro-benchmark of the Filter distance calculations.
+
+    Compares the original per-location ``geodesic`` loop with DistanceEngine on
+    synthetic stores scattered around Texas::
+
+        python benchmarks/bench_distance.py -n 5000 -r 50
+"""
+
+import argparse
+import random
+import timeit
+
+from farquaad.base import distance
+from farquaad.base.distance import DistanceEngine, geodesicMiles
+
+HOME = (30.2672, -97.7431)
+
+
+def synthetic(count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.uniform(25.8, 36.5), rng.uniform(-106.6, -93.5)) for _ in range(count)]
+
+
+def loop(coordinates, radius):
+    return [c for c in coordinates if geodesicMiles(HOME, c) <= radius]
+
+
+def engine(coordinates, radius):
+    miles = DistanceEngine(HOME, radius).distances(coordinates)
+    return [c for c, m in zip(coordinates, miles) if m <= radius]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--locations", type=int, default=5000)
+    parser.add_argument("-r", "--radius", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    coordinates = synthetic(args.locations)
+    assert loop(coordinates, args.radius) == engine(coordinates, args.radius)
+
+    print(f"{args.locations} locations, {args.radius} mile radius, best of {args.repeat}")
+    baseline = min(timeit.repeat(lambda: loop(coordinates, args.radius), number=1, repeat=args.repeat))
+    print(f"  geodesic loop       {baseline * 1000:9.2f} ms")
+    for label, vectorized in (("numpy", distance.numpy), ("pure python", None)):
+        if label == "numpy" and vectorized is None:
+            continue
+        saved, distance.numpy = distance.numpy, vectorized
+        try:
+            best = min(timeit.repeat(lambda: engine(coordinates, args.radius), number=1, repeat=args.repeat))
+        finally:
+            distance.numpy = saved
+        print(f"  engine, {label:11} {best * 1000:9.2f} ms  {baseline / best:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+    End to end booking benchmark against the local HEB stand-in.
+
+    Every run closes all stores, opens slots at a few of them after a random
+    pause and measures, from the moment the feed changed, how long monitoring
+    takes to detect them (time-to-detect) and how long until the confirmation
+    page is requested (time-to-book), with a real Firefox doing the booking.
+    Results, including the per-phase latencies, are saved under
+    ``benchmarks/results/<commit>.json`` so commits can be compared::
+
+        python benchmarks/bench_e2e.py --headless -n 10
+        python benchmarks/bench_e2e.py --headless -n 10 --compare benchmarks/results/1a2b3c4.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from standin import StandIn, synthetic
+
+from farquaad.base import Restrictions, browser
+from farquaad.base.geocache import GeoCache
+from farquaad.base.metrics import metrics
+from farquaad.distributors.heb import HEB
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+HOME = "Austin, TX"
+HOME_LATLONG = (30.2672, -97.7431)
+
+PATIENT = {
+    "manufacturer": ["Moderna"],
+    "firstname": "Jane",
+    "lastname": "Doe",
+    "email": "jane.doe@example.com",
+    "phone": "512-555-0100",
+    "birthdate": "01/02/1950",
+    "provider": "",
+    "certify": "Phase1B",
+}
+
+
+def commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return sha + ("-dirty" if dirty else "")
+
+
+def stats(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)],
+        "max": ordered[-1],
+    }
+
+
+def phases():
+    return {
+        phase: {"count": histogram.count, "p50": histogram.quantile(0.5), "p95": histogram.quantile(0.95)}
+        for phase, histogram in metrics.phases().items()
+    }
+
+
+def run(standin, henryebutts, args, rng):
+    standin.reset()
+    opening = rng.sample(range(len(standin.stores)), args.open)
+    soldout = set(opening[:args.soldout])
+    timer = threading.Timer(rng.uniform(0.2, 1.0), standin.open, (opening,), {"soldout": soldout})
+    timer.start()
+    restrictions = Restrictions(cities=None, zipcodes=None, distance=args.radius)
+    sites = henryebutts.monitor(HOME, restrictions, args.delay, incremental=args.incremental)
+    detected = time.perf_counter()
+    timer.join()
+    booked = henryebutts.schedule(sites, PATIENT)
+    result = {"detect": detected - standin.openedAt, "book": None, "sites": len(sites)}
+    if booked and standin.bookedAt is not None:
+        result["book"] = standin.bookedAt - standin.openedAt
+    return result
+
+
+def compare(previous, current):
+    print(f"{'':16}{previous['commit']:>12}{current['commit']:>12}{'change':>9}")
+    rows = [(key, previous["summary"].get(key, {}), current["summary"].get(key, {})) for key in ("detect", "book")]
+    rows += [(phase, previous["phases"].get(phase, {}), current["phases"][phase]) for phase in current["phases"]]
+    for key, before, after in rows:
+        if "p50" not in before or "p50" not in after:
+            continue
+        change = (after["p50"] - before["p50"]) / before["p50"] if before["p50"] else 0.0
+        print(f"  {key:14}{before['p50'] * 1000:10.0f}ms{after['p50'] * 1000:10.0f}ms{change:+9.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--stores", type=int, default=300, help="stores in the feed")
+    parser.add_argument("--open", type=int, default=3, help="stores opening slots each run")
+    parser.add_argument("--soldout", type=int, default=0, help="of which sold out by the time the page loads")
+    parser.add_argument("-r", "--radius", type=float, default=500.0)
+    parser.add_argument("-t", "--delay", type=float, default=0.25, help="poll delay, seconds")
+    parser.add_argument("--latency", type=int, default=50, help="page render latency, milliseconds")
+    parser.add_argument("--mode", choices=browser.MODES, default=browser.STANDARD)
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stdout)
+    logger = logging.getLogger("bench_e2e")
+
+    if args.open <= args.soldout:
+        parser.error("--open has to be larger than --soldout for a booking to be possible")
+    standin = StandIn(synthetic(args.stores), latency=args.latency)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = GeoCache(directory)
+        # nothing may leave the machine, so the home address is known up front
+        cache.geocode(HOME, lambda address: HOME_LATLONG)
+        driver = browser.firefox(args.mode, headless=args.headless)
+        henryebutts = HEB(driver, logger, cache=cache, statusUrl=standin.statusUrl)
+        rng = random.Random(0)
+        runs = []
+        try:
+            for number in range(args.runs):
+                result = run(standin, henryebutts, args, rng)
+                runs.append(result)
+                book = "failed" if result["book"] is None else f"{result['book'] * 1000:.0f} ms"
+                print(f"run {number + 1}: detected in {result['detect'] * 1000:.0f} ms, booked in {book}")
+        finally:
+            henryebutts.finalize()
+            standin.close()
+
+    results = {
+        "commit": commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("compare", "verbose")},
+        "runs": runs,
+        "summary": {
+            "detect": stats([run["detect"] for run in runs]),
+            "book": stats([run["book"] for run in runs if run["book"] is not None]),
+            "failures": sum(run["book"] is None for run in runs),
+        },
+        "phases": phases(),
+    }
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, f"{results['commit']}.json")
+    with open(path, "w") as out:
+        json.dump(results, out, indent=2)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), results)
+
+
+if __name__ == "__main__":
+    main()
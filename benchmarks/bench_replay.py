@@ -0,0 +1,67 @@
+"""
+    Replays a --record recording to tune polling and booking settings.
+
+    Every combination of the given time delays, distances and concurrencies is
+    simulated over the whole recording on a simulated clock, so a day of feed
+    takes seconds, and the detection lag, polls and bookings of each are
+    reported. Filtering throughput over every recorded snapshot is measured
+    too::
+
+        python benchmarks/bench_replay.py feed.jsonl.gz -H "Austin, TX" -t 5 10 30 -d 25 50 -k 1 3
+"""
+
+import argparse
+import itertools
+import logging
+import time
+
+from farquaad.base import Filter, Restrictions
+from farquaad.base.geocache import GeoCache
+from farquaad.distributors.replay import Replay, ReplayDistributor
+
+
+def throughput(replay, home, restrictions, cache):
+    refine = Filter(home, restrictions, cache=cache)
+    started = time.perf_counter()
+    locations = 0
+    for snapshot in replay.snapshots:
+        refine.apply(snapshot)
+        locations += len(snapshot)
+    return locations, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording")
+    parser.add_argument("-H", "--home", required=True)
+    parser.add_argument("-t", "--time-delay", dest="delays", type=float, nargs="+", default=[10.0])
+    parser.add_argument("-d", "--distance", dest="distances", type=float, nargs="+", default=[50.0])
+    parser.add_argument("-k", "--parallel", dest="concurrencies", type=int, nargs="+", default=[1])
+    parser.add_argument("--booking-seconds", type=float, default=20.0, help="simulated duration of a booking attempt")
+    parser.add_argument("--speed", type=float, help="replay this many times faster than real time instead of at once")
+    args = parser.parse_args()
+    logger = logging.getLogger("bench_replay")
+    cache = GeoCache()
+
+    replay = Replay(args.recording, speed=args.speed)
+    hours = (replay.end - replay.clock) / 3600
+    print(f"{args.recording}: {len(replay.snapshots)} snapshots over {hours:.1f} hours, {len(replay.openings)} stores")
+
+    locations, elapsed = throughput(replay, args.home, Restrictions(cities=None, zipcodes=None, distance=max(args.distances)), cache)
+    print(f"Filter throughput: {locations} locations in {elapsed * 1000:.0f} ms ({locations / elapsed:,.0f}/s)")
+
+    print(f"{'delay':>7}{'miles':>7}{'k':>4}{'polls':>8}{'attempts':>10}{'booked':>8}{'mean lag':>10}{'max lag':>9}")
+    for delay, distance, concurrency in itertools.product(args.delays, args.distances, args.concurrencies):
+        replay.rewind()
+        distributor = ReplayDistributor(replay, logger, bookingSeconds=args.booking_seconds, cache=cache)
+        restrictions = Restrictions(cities=None, zipcodes=None, distance=distance)
+        result = distributor.simulate(args.home, restrictions, delay, concurrency)
+        print(
+            f"{delay:7.1f}{distance:7.0f}{concurrency:4}{result['polls']:8}{result['attempts']:10}"
+            f"{result['bookings']:8}{result['meanLag']:9.1f}s{result['maxLag']:8.1f}s"
+        )
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
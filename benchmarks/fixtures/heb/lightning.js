@@ -0,0 +1,68 @@
+// Just enough of the Lightning components the HEB scheduling pages are built
+// from: comboboxes only render their items once opened, and every step of the
+// form renders after a delay, like the real pages waiting on their backend.
+var stand = {
+    params: new URLSearchParams(location.search),
+
+    latency: function () {
+        return Number(stand.params.get("latency") || 50);
+    },
+
+    later: function (render) {
+        setTimeout(render, stand.latency());
+    },
+
+    combobox: function (parent, values, onPick) {
+        var combo = document.createElement("lightning-combobox");
+        var button = document.createElement("button");
+        var dropdown = document.createElement("div");
+        button.type = "button";
+        button.textContent = "Select an option";
+        combo.appendChild(button);
+        combo.appendChild(dropdown);
+        button.addEventListener("click", function () {
+            dropdown.innerHTML = "";
+            values.forEach(function (value) {
+                var item = document.createElement("lightning-base-combobox-item");
+                item.setAttribute("data-value", value);
+                item.innerHTML = "<span></span><span><span>" + value + "</span></span>";
+                item.addEventListener("click", function () {
+                    button.textContent = value;
+                    dropdown.innerHTML = "";
+                    onPick(value);
+                });
+                dropdown.appendChild(item);
+            });
+        });
+        parent.appendChild(combo);
+        return combo;
+    },
+
+    button: function (parent, label, onClick) {
+        var wrapper = document.createElement("lightning-button");
+        var button = document.createElement("button");
+        button.type = "button";
+        button.textContent = label;
+        button.addEventListener("click", onClick);
+        wrapper.appendChild(button);
+        parent.appendChild(wrapper);
+        return wrapper;
+    },
+
+    input: function (parent, attributes) {
+        var wrapper = document.createElement("lightning-input");
+        var div = document.createElement("div");
+        var input = document.createElement("input");
+        Object.keys(attributes).forEach(function (name) {
+            input.setAttribute(name, attributes[name]);
+        });
+        div.appendChild(input);
+        wrapper.appendChild(div);
+        parent.appendChild(wrapper);
+        return input;
+    },
+
+    go: function (page) {
+        location.href = page + location.search;
+    }
+};
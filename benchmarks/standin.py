@@ -0,0 +1,210 @@
+"""
+    Local stand-in for the HEB vaccine scheduling site.
+
+    Serves a ``vaccine_locations.json`` feed, honoring If-None-Match and gzip
+    like the real one, and the appointment, patient and confirmation pages from
+    ``fixtures/heb``. The feed starts with every store closed; open() makes
+    slots appear, and the time the confirmation page is requested is recorded
+    as the moment the booking went through. Run it on its own to click through
+    the pages by hand::
+
+        python benchmarks/standin.py --port 8000 --open 3
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "heb")
+
+PAGES = {
+    "/appointment": "appointment.html",
+    "/patient": "patient.html",
+    "/confirmation": "confirmation.html",
+    "/lightning.js": "lightning.js",
+}
+
+CONTENT_TYPES = {".html": "text/html; charset=utf-8", ".js": "application/javascript"}
+
+# (city, zip, latitude, longitude) the synthetic stores are scattered around
+CITIES = (
+    ("Austin", "78701", 30.2672, -97.7431),
+    ("Round Rock", "78664", 30.5083, -97.6789),
+    ("San Marcos", "78666", 29.8833, -97.9414),
+    ("San Antonio", "78205", 29.4241, -98.4936),
+    ("Houston", "77002", 29.7604, -95.3698),
+    ("Waco", "76701", 31.5493, -97.1467),
+)
+
+
+def synthetic(count, seed=0):
+    """``count`` closed stores, with coordinates, in the shape of the HEB feed
+    """
+    rng = random.Random(seed)
+    stores = []
+    for number in range(count):
+        city, zipcode, latitude, longitude = CITIES[number % len(CITIES)]
+        stores.append({
+            "name": f"H-E-B {city} #{number}",
+            "storeNumber": number,
+            "street": f"{100 + number} Main St",
+            "city": city,
+            "state": "TX",
+            "zip": zipcode,
+            "latitude": latitude + rng.uniform(-0.1, 0.1),
+            "longitude": longitude + rng.uniform(-0.1, 0.1),
+            "type": "store",
+            "openTimeslots": 0,
+            "openAppointmentSlots": 0,
+            "slotDetails": [],
+            "url": None,
+        })
+    return stores
+
+
+class StandIn(object):
+    """The stand-in server, running on a background thread until close()
+
+    Args:
+      stores (list): feed locations, see synthetic()
+      port (int): port to listen on, 0 for any free one
+      latency (int): milliseconds each step of the pages takes to render
+    """
+
+    def __init__(self, stores, port=0, latency=50):
+        self.stores = stores
+        self.latency = latency
+        self.openedAt = None
+        self.bookedAt = None
+        self.booked = None
+        self.polls = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._publish()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+
+    @property
+    def base(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def statusUrl(self):
+        return f"{self.base}/vaccine_locations.json"
+
+    def _publish(self):
+        body = json.dumps({"locations": self.stores}).encode()
+        with self._lock:
+            self._body = body
+            self._etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            self._gzipped = gzip.compress(body)
+
+    def reset(self):
+        """Close every store again
+        """
+        for store in self.stores:
+            store["openTimeslots"] = store["openAppointmentSlots"] = 0
+            store["url"] = None
+        self.openedAt = self.bookedAt = self.booked = None
+        self._publish()
+
+    def open(self, numbers, slots=4, soldout=()):
+        """Give the stores ``numbers`` open slots, and start the detection clock
+
+        Stores in ``soldout`` are advertised by the feed but their appointment
+        page says there is nothing left, like a slot taken in the meantime.
+        """
+        for number in numbers:
+            store = self.stores[number]
+            query = f"store={number}&latency={self.latency}" + ("&soldout=1" if number in soldout else "")
+            store["openTimeslots"] = store["openAppointmentSlots"] = slots
+            store["url"] = f"{self.base}/appointment?{query}"
+        self.openedAt = time.perf_counter()
+        self.bookedAt = None
+        self._publish()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/vaccine_locations.json":
+                    self.feed()
+                elif parts.path in PAGES:
+                    if parts.path == "/confirmation":
+                        standin.bookedAt = time.perf_counter()
+                        standin.booked = parts.query
+                    self.page(PAGES[parts.path])
+                else:
+                    self.send_error(404)
+
+            def feed(self):
+                with standin._lock:
+                    standin.polls += 1
+                    body, etag, gzipped = standin._body, standin._etag, standin._gzipped
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                compress = "gzip" in self.headers.get("Accept-Encoding", "")
+                self.reply(gzipped if compress else body, "application/json", etag=etag, gzipped=compress)
+
+            def page(self, name):
+                with open(os.path.join(FIXTURES, name), "rb") as fixture:
+                    self.reply(fixture.read(), CONTENT_TYPES[os.path.splitext(name)[1]])
+
+            def reply(self, body, contentType, etag=None, gzipped=False):
+                self.send_response(200)
+                self.send_header("Content-Type", contentType)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                if etag:
+                    self.send_header("ETag", etag)
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--stores", type=int, default=300)
+    parser.add_argument("--open", type=int, default=3, help="open slots at this many stores")
+    parser.add_argument("--latency", type=int, default=50)
+    args = parser.parse_args()
+
+    standin = StandIn(synthetic(args.stores), port=args.port, latency=args.latency)
+    standin.open(range(args.open))
+    print(f"Feed at {standin.statusUrl}, first appointment page at {standin.stores[0]['url']}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        standin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import base64
+import json
+import os
+
+STANDARD = "standard"
+LEAN = "lean"
+MODES = (STANDARD, LEAN)
+
+# third party analytics and ad hosts the scheduling pages pull in; reCAPTCHA
+# (google.com/gstatic.com) is deliberately not listed
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.com",
+    "hotjar.com",
+    "nr-data.net",
+    "newrelic.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "bing.com",
+    "adsrvr.org",
+    "demdex.net",
+    "omtrdc.net",
+)
+
+# preferences of the lean mode: no images, web fonts or media, no background
+# services competing for the network, and generous in-memory caches; stylesheets
+# stay on since the Lightning components need their layout to be clickable
+LEAN_PREFERENCES = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "media.autoplay.default": 5,
+    "media.autoplay.blocking_policy": 2,
+    "media.mediasource.enabled": False,
+    "media.peerconnection.enabled": False,
+    "browser.cache.disk.enable": True,
+    "browser.cache.memory.enable": True,
+    "browser.cache.memory.capacity": 131072,
+    "network.http.max-persistent-connections-per-server": 8,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.safebrowsing.downloads.enabled": False,
+    "toolkit.telemetry.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "app.update.enabled": False,
+    "app.update.auto": False,
+    "extensions.update.enabled": False,
+    "extensions.pocket.enabled": False,
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.newtabpage.enabled": False,
+    "browser.startup.page": 0,
+}
+
+
+# let pages opened by script (the prefetcher's) open as tabs instead of being blocked as popups
+TAB_PREFERENCES = {
+    "dom.disable_open_during_load": False,
+    "dom.popup_maximum": -1,
+    "browser.link.open_newwindow": 3,
+}
+
+
+def blockingPac(hosts=BLOCKED_HOSTS):
+    """Proxy auto-config sending ``hosts`` (and their subdomains) to a dead port
+    """
+    script = (
+        "function FindProxyForURL(url, host) {\n"
+        f"  var blocked = {json.dumps(list(hosts))};\n"
+        "  for (var i = 0; i < blocked.length; i++) {\n"
+        "    if (host == blocked[i] || dnsDomainIs(host, '.' + blocked[i])) {\n"
+        "      return 'PROXY 127.0.0.1:9';\n"
+        "    }\n"
+        "  }\n"
+        "  return 'DIRECT';\n"
+        "}\n"
+    )
+    return "data:application/x-ns-proxy-autoconfig;base64," + base64.b64encode(script.encode()).decode()
+
+
+def preferences(mode):
+    if mode != LEAN:
+        return {}
+    prefs = dict(LEAN_PREFERENCES)
+    prefs["network.proxy.type"] = 2
+    prefs["network.proxy.autoconfig_url"] = blockingPac()
+    return prefs
+
+
+def firefoxOptions(mode=STANDARD, profile=None, headless=False, persistent=False, tabs=False):
+    """Firefox options for a browsing ``mode``
+
+    Args:
+      mode (str): "standard" or "lean"
+      profile (str): prepared profile directory
+      headless (bool): use Firefox's native headless mode, no X display needed
+      persistent (bool): run straight out of ``profile`` rather than a copy, so
+        cookies and history (reCAPTCHA reputation) accumulate across runs
+      tabs (bool): allow scripts to open background tabs, for the Prefetcher
+    """
+    from selenium.webdriver.firefox.options import Options
+    options = Options()
+    options.headless = headless
+    prefs = preferences(mode)
+    if tabs:
+        prefs.update(TAB_PREFERENCES)
+    for name, value in prefs.items():
+        options.set_preference(name, value)
+    if profile and persistent:
+        os.makedirs(profile, exist_ok=True)
+        options.add_argument("-profile")
+        options.add_argument(profile)
+    return options
+
+
+def firefox(mode=STANDARD, profile=None, headless=False, persistent=False, tabs=False):
+    # Selenium is imported here so the CLI can read MODES without loading it
+    from selenium import webdriver
+    options = firefoxOptions(mode, profile, headless, persistent, tabs)
+    copied = webdriver.FirefoxProfile(profile) if profile and not persistent else None
+    return webdriver.Firefox(firefox_profile=copied, options=options)
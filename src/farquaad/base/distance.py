@@ -0,0 +1,115 @@
+import math
+
+from geopy.distance import geodesic
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+EARTH_RADIUS_MILES = 3958.7613
+# the spherical haversine distance is within ~0.5% of the WGS-84 geodesic, so
+# only results this close to the radius can land on the wrong side of it
+BOUNDARY_TOLERANCE = 0.006
+
+
+def geodesicMiles(origin, destination):
+    return geodesic(origin, destination).miles
+
+
+def haversine(origin, destination):
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def boundingBox(latlong, miles):
+    """(south, north, west, east) degrees enclosing every point within ``miles`` of ``latlong``
+    """
+    lat, lon = latlong
+    miles *= 1 + BOUNDARY_TOLERANCE
+    dlat = math.degrees(miles / EARTH_RADIUS_MILES)
+    coslat = math.cos(math.radians(lat))
+    if dlat + abs(lat) >= 90 or coslat <= 0:
+        dlon = 180.0
+    else:
+        dlon = min(180.0, math.degrees(miles / (EARTH_RADIUS_MILES * coslat)))
+    return (lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+
+
+class DistanceEngine(object):
+    """Distances from one home to many stores
+
+    Stores outside the lat/lon box around the radius are rejected without any
+    trigonometry, the rest get a (NumPy vectorized when available) haversine
+    distance, and only those close enough to the radius for the spherical
+    approximation to matter are refined with the exact geodesic ``measure``.
+    Rejected stores come back as ``math.inf``.
+    """
+
+    def __init__(self, home, radius=None, measure=geodesicMiles):
+        self.home = tuple(home)
+        self.radius = radius
+        self.measure = measure
+        self.box = None if radius is None else boundingBox(self.home, radius)
+
+    def inBox(self, latlong):
+        if self.box is None:
+            return True
+        south, north, west, east = self.box
+        lat, lon = latlong
+        if not south <= lat <= north:
+            return False
+        # wrap the longitude difference into [-180, 180) so boxes crossing the antimeridian work
+        dlon = (lon - self.home[1] + 180.0) % 360.0 - 180.0
+        return abs(dlon) <= (east - west) / 2
+
+    def _nearBoundary(self, miles):
+        return self.radius is not None and abs(miles - self.radius) <= self.radius * BOUNDARY_TOLERANCE
+
+    def distance(self, latlong):
+        latlong = tuple(latlong)
+        if not self.inBox(latlong):
+            return math.inf
+        miles = haversine(self.home, latlong)
+        if self._nearBoundary(miles):
+            miles = self.measure(self.home, latlong)
+        return miles
+
+    def distances(self, coordinates):
+        """Miles from home for each (latitude, longitude) in ``coordinates``
+        """
+        if numpy is None or len(coordinates) == 0:
+            return [self.distance(latlong) for latlong in coordinates]
+        points = numpy.asarray(coordinates, dtype=float).reshape(-1, 2)
+        return self._vectorized(points[:, 0], points[:, 1])
+
+    def distancesOf(self, latitudes, longitudes):
+        """Miles from home for each store of two parallel coordinate columns
+
+        Columns backed by the buffer protocol, like ``array("d")``, are handed
+        to NumPy without copying.
+        """
+        if numpy is None or len(latitudes) == 0:
+            return [self.distance(latlong) for latlong in zip(latitudes, longitudes)]
+        return self._vectorized(numpy.asarray(latitudes, dtype=float), numpy.asarray(longitudes, dtype=float))
+
+    def _vectorized(self, lat, lon):
+        miles = numpy.full(len(lat), math.inf)
+        inside = numpy.ones(len(lat), dtype=bool)
+        if self.box is not None:
+            south, north, west, east = self.box
+            dlon = numpy.abs((lon - self.home[1] + 180.0) % 360.0 - 180.0)
+            inside = (lat >= south) & (lat <= north) & (dlon <= (east - west) / 2)
+
+        lat1, lon1 = math.radians(self.home[0]), math.radians(self.home[1])
+        lat2, lon2 = numpy.radians(lat[inside]), numpy.radians(lon[inside])
+        a = numpy.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+        miles[inside] = 2 * EARTH_RADIUS_MILES * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+
+        if self.radius is not None:
+            boundary = numpy.abs(miles - self.radius) <= self.radius * BOUNDARY_TOLERANCE
+            for i in numpy.flatnonzero(boundary):
+                miles[i] = self.measure(self.home, (float(lat[i]), float(lon[i])))
+        return miles.tolist()
@@ -0,0 +1,133 @@
+import queue
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+
+def processRss(driver):
+    """Resident memory of the browser behind ``driver`` in MB, None when unknown
+    """
+    pid = driver.capabilities.get("moz:processID")
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class DriverPool(object):
+    """Keeps ``size`` warm WebDriver sessions ready for booking attempts
+
+    Sessions are launched in the background, handed out by acquire() and
+    returned by release(). A session is replaced when it fails its health
+    check, after ``maxUses`` bookings or once the browser grows past ``maxRss``
+    MB, and the replacement is launched in the background as well, so a booking
+    never waits for a browser to start unless every session is busy. A
+    ``lazy`` pool launches nothing until start() or the first acquire().
+    A launch that fails is raised by the acquire() waiting for it, which
+    launches the browser again in the background for the next one.
+    """
+
+    def __init__(self, factory, logger, size=1, maxUses=20, maxRss=1024, lazy=False):
+        self._factory = factory
+        self._logger = logger
+        self.size = size
+        self.maxUses = maxUses
+        self.maxRss = maxRss
+        self._idle = queue.Queue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = False
+        if not lazy:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._replenish()
+
+    def _launch(self):
+        try:
+            driver = self._factory()
+        except Exception as e:
+            self._logger.error(f"Failed to launch a pooled browser: {e}")
+            # wakes up whoever is waiting for this browser, instead of leaving them waiting forever
+            self._idle.put(e)
+            return
+        with self._lock:
+            if self._closed:
+                driver.quit()
+                return
+            self._uses[driver] = 0
+        self._logger.debug("Pooled browser ready")
+        self._idle.put(driver)
+
+    def _replenish(self):
+        threading.Thread(target=self._launch, name="farquaad-driver", daemon=True).start()
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+        if not self._closed:
+            self._replenish()
+
+    def healthy(self, driver):
+        try:
+            return driver.execute_script("return 1;") == 1
+        except WebDriverException:
+            return False
+
+    def acquire(self, timeout=None):
+        """Borrow a healthy session, waiting up to ``timeout`` seconds for one
+        """
+        self.start()
+        while True:
+            driver = self._idle.get(timeout=timeout)
+            if isinstance(driver, Exception):
+                if not self._closed:
+                    self._replenish()
+                raise driver
+            if self.healthy(driver):
+                return driver
+            self._logger.info("Pooled browser failed its health check, replacing it")
+            self._discard(driver)
+
+    def release(self, driver):
+        with self._lock:
+            self._uses[driver] = uses = self._uses.get(driver, 0) + 1
+        rss = processRss(driver) if self.maxRss else None
+        if uses >= self.maxUses or (rss is not None and rss > self.maxRss):
+            self._logger.info(f"Recycling pooled browser after {uses} uses ({rss or 0:.0f} MB)")
+            self._discard(driver)
+            return
+        try:
+            # drop the page but keep the cookies that build reCAPTCHA reputation
+            driver.get("about:blank")
+        except WebDriverException:
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            drivers = list(self._uses)
+            self._uses.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
@@ -0,0 +1,135 @@
+import io
+import os
+import queue
+import re
+import threading
+import time
+
+from .metrics import metrics
+
+ALWAYS = "always"
+SUBMIT = "submit"
+FAILURE = "failure"
+OFF = "off"
+MODES = (ALWAYS, SUBMIT, FAILURE, OFF)
+# the step captured once the booking has been submitted
+SUBMITTED = "confirmation"
+# screenshots waiting for the writer, beyond which new ones are dropped
+QUEUE_SIZE = 16
+# screenshots are scaled down by this factor when Pillow is available
+SCALE = 0.5
+
+
+def slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-").lower() or "page"
+
+
+class EvidenceWriter(object):
+    """Writes booking attempt screenshots to ``directory`` from a background thread
+
+    A booking attempt only pays for the browser encoding the screenshot;
+    downscaling (with Pillow, when installed), compressing and writing the file
+    happen on the writer thread. When the writer falls more than ``queueSize``
+    screenshots behind, new ones are dropped rather than waited on.
+
+    Modes:
+      always: every step of every attempt
+      submit: only the page reached after submitting the booking
+      failure: only the page an unsuccessful attempt stopped on
+      off: nothing
+    """
+
+    def __init__(self, directory, logger, mode=ALWAYS, queueSize=QUEUE_SIZE, scale=SCALE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown screenshot mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.scale = scale
+        self.written = 0
+        self.dropped = 0
+        self._logger = logger
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._thread = None
+        if mode != OFF:
+            self._thread = threading.Thread(target=self._run, name="farquaad-evidence", daemon=True)
+            self._thread.start()
+
+    def attempt(self, store):
+        return Attempt(self, store)
+
+    def grab(self, page, name):
+        """Screenshot ``page`` now and queue it for writing as ``name``
+        """
+        with metrics.timed("capture"):
+            try:
+                png = page.screenshot()
+            except Exception as e:
+                self._logger.info(f"Screenshot {name} failed: {e}")
+                return
+        try:
+            self._queue.put_nowait((name, png))
+        except queue.Full:
+            self.dropped += 1
+            metrics.count("evidence_total", result="dropped")
+            self._logger.info(f"Screenshot writer is behind, dropped {name}")
+
+    def _encode(self, png):
+        if self.scale >= 1:
+            return png
+        # imported on the writer thread, so neither startup nor a booking pays for it
+        try:
+            from PIL import Image
+        except ImportError:
+            return png
+        image = Image.open(io.BytesIO(png))
+        image.thumbnail((max(1, int(image.width * self.scale)), max(1, int(image.height * self.scale))))
+        out = io.BytesIO()
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+    def _write(self, name, png):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "wb") as out:
+            out.write(self._encode(png))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, png = item
+            try:
+                self._write(name, png)
+                self.written += 1
+                metrics.count("evidence_total", result="written")
+            except Exception as e:
+                metrics.count("evidence_total", result="failed")
+                self._logger.info(f"Failed to write screenshot {name}: {e}")
+
+    def close(self):
+        """Write out the queued screenshots and stop the writer
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class Attempt(object):
+    """The screenshots of one booking attempt, taken as the writer's mode asks
+    """
+
+    def __init__(self, writer, store):
+        self.writer = writer
+        self.prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug(store)}"
+
+    def capture(self, page, step):
+        mode = self.writer.mode
+        if mode == ALWAYS or (mode == SUBMIT and step == SUBMITTED):
+            self.writer.grab(page, f"{self.prefix}-{step}.png")
+
+    def finish(self, booked, page):
+        """Capture where ``page``'s browser stopped if the attempt failed and only failures are kept
+        """
+        if not booked and self.writer.mode == FAILURE:
+            self.writer.grab(page, f"{self.prefix}-failed.png")
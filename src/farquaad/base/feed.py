@@ -0,0 +1,233 @@
+import codecs
+import gzip
+import hashlib
+import http.client
+import json
+import re
+import socket
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from .metrics import metrics
+
+# bytes read from the socket at a time when streaming the feed
+CHUNK_SIZE = 16 * 1024
+
+
+class FeedPoller(object):
+    """Conditional, keep-alive HTTP client for polling a distributor's status feed
+
+    One connection is kept open across polls, the body is requested gzip
+    compressed and the ETag/Last-Modified validators from the previous
+    response are sent back so an unchanged feed costs a bodiless 304.
+    """
+
+    def __init__(self, url, logger, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self._logger = logger
+        parts = urlsplit(url)
+        self._https = parts.scheme == "https"
+        self._host = parts.netloc
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+        self._conn = None
+        self.etag = None
+        self.lastModified = None
+        self.digest = None
+        # status of the last poll: an HTTP status code, or None on a
+        # connection level failure
+        self.status = None
+
+    def _connect(self):
+        if self._conn is None:
+            factory = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._conn = factory(self._host, timeout=self.timeout)
+        return self._conn
+
+    def _headers(self):
+        headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive",
+            "User-Agent": "farquaad-cli",
+        }
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.lastModified:
+            headers["If-Modified-Since"] = self.lastModified
+        return headers
+
+    def _send(self, deadline):
+        conn = self._connect()
+        conn.request("GET", self._path, headers=self._headers())
+        if conn.sock is not None:
+            conn.sock.settimeout(max(deadline - time.monotonic(), 0.001))
+        return conn.getresponse()
+
+    def _respond(self, deadline):
+        try:
+            return self._send(deadline)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # the server dropped our idle keep-alive connection, retry once
+            self.close()
+            return self._send(deadline)
+
+    def _accept(self, response):
+        self.status = response.status
+        metrics.count("feed_responses_total", status=response.status)
+        if response.status == 304:
+            self._logger.debug(f"{self.url} not modified")
+            return False
+        if response.status != 200:
+            self._logger.info(f"Unexpected response polling {self.url}: {response.status} {response.reason}")
+            return False
+        return True
+
+    def _failed(self, e):
+        self._logger.info(f"Failed to poll {self.url}: {e}")
+        metrics.count("feed_responses_total", status="error")
+        self.close()
+        self.status = None
+
+    def fetch(self):
+        """Poll the feed once
+
+        Returns:
+          bytes: the decoded body, or None when the feed has not changed since
+          the last poll (304 or identical body) or the request failed
+        """
+        with metrics.timed("feed_fetch"):
+            return self._fetch()
+
+    def _fetch(self):
+        # the whole exchange has to fit in the timeout budget, so every socket
+        # operation only gets whatever is left of it
+        deadline = time.monotonic() + self.timeout
+        try:
+            response = self._respond(deadline)
+            body = response.read()
+            if time.monotonic() > deadline:
+                raise socket.timeout(f"{self.url} took longer than {self.timeout}s")
+        except (OSError, http.client.HTTPException) as e:
+            self._failed(e)
+            return None
+        if response.will_close:
+            self.close()
+        if not self._accept(response):
+            return None
+
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        digest = hashlib.sha1(body).digest()
+        self.etag = response.getheader("ETag", self.etag)
+        self.lastModified = response.getheader("Last-Modified", self.lastModified)
+        if digest == self.digest:
+            self._logger.debug(f"{self.url} body unchanged")
+            metrics.count("feed_unchanged_total")
+            return None
+        self.digest = digest
+        return body
+
+    def stream(self):
+        """Poll the feed once, yielding the decoded body as it arrives
+
+        Yields nothing when the feed has not changed (304) or the request failed.
+        The validators are only remembered once the body has been read to the
+        end, so a stream abandoned half way is fetched in full on the next poll.
+        Each socket read gets the full timeout rather than sharing one budget.
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            response = self._respond(deadline)
+        except (OSError, http.client.HTTPException) as e:
+            self._failed(e)
+            return
+        if not self._accept(response):
+            response.read()
+            if response.will_close:
+                self.close()
+            return
+
+        gzipped = response.getheader("Content-Encoding", "").lower() == "gzip"
+        inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        digest = hashlib.sha1()
+        complete = False
+        try:
+            while True:
+                chunk = response.read1(CHUNK_SIZE)
+                if not chunk:
+                    # releases the connection for the next request
+                    response.read()
+                    break
+                if inflate is not None:
+                    chunk = inflate.decompress(chunk)
+                digest.update(chunk)
+                yield chunk
+            if inflate is not None:
+                tail = inflate.flush()
+                digest.update(tail)
+                yield tail
+            complete = True
+        except (OSError, http.client.HTTPException, zlib.error) as e:
+            self._failed(e)
+            return
+        finally:
+            # an unfinished response leaves the connection unusable
+            if not complete or response.will_close:
+                self.close()
+
+        self.etag = response.getheader("ETag", self.etag)
+        self.lastModified = response.getheader("Last-Modified", self.lastModified)
+        self.digest = digest.digest()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def iterArray(chunks, key):
+    """Decode the items of the top level ``key`` array of a JSON document one at a time
+
+    ``chunks`` is any iterable of bytes, such as FeedPoller.stream(); only the
+    item being decoded is kept in memory, never the whole document.
+    """
+    start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    chunks = iter(chunks)
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    text = ""
+    inside = False
+    for chunk in chunks:
+        text += utf8.decode(chunk)
+        pos = 0
+        if not inside:
+            found = start.search(text)
+            if found is None:
+                # keep enough to match a key split across chunks
+                text = text[-(len(key) + 64):]
+                continue
+            inside = True
+            pos = found.end()
+        while True:
+            while pos < len(text) and text[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(text):
+                break
+            if text[pos] == "]":
+                # drain the rest of the document so the source can finish cleanly
+                for _ in chunks:
+                    pass
+                return
+            try:
+                item, pos = decoder.raw_decode(text, pos)
+            except ValueError:
+                # the item continues in the next chunk
+                break
+            yield item
+        text = text[pos:]
+    if inside and text.strip():
+        raise ValueError(f"Truncated '{key}' array: {text[:64]!r}")
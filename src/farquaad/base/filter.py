@@ -0,0 +1,132 @@
+from array import array
+
+from geopy.geocoders import Nominatim
+
+from .distance import DistanceEngine, geodesicMiles
+from .metrics import metrics
+
+# verdict of a store the filter hasn't seen yet
+_UNSEEN = object()
+
+
+def storeKey(loc):
+    # a store is judged again only if it moves or changes place
+    return (loc.name, loc.city, loc.zip, loc.latitude, loc.longitude)
+
+
+class Filter(object):
+    def __init__(self, home, restrictions, cache=None):
+        self.home = home
+        self.restrictions = restrictions
+        self.compiled = restrictions.compile()
+        self.cache = cache
+        self.geolocator = Nominatim(user_agent='farquaad-cli')
+        self.latlong = self.geocode(self.home)
+        self.engine = DistanceEngine(self.latlong, restrictions.distance, measure=self._exact)
+        # store coordinates -> miles from home, in front of the persistent cache
+        self.distances = {}
+        # storeKey -> miles from home of the stores within the restrictions,
+        # None for those outside them
+        self.verdicts = {}
+
+    def _resolve(self, address):
+        geoloc = self.geolocator.geocode(address)
+        if geoloc is None:
+            return None
+        return (geoloc.latitude, geoloc.longitude)
+
+    def _exact(self, origin, destination):
+        if self.cache is None:
+            return geodesicMiles(origin, destination)
+        return self.cache.distance(origin, destination, geodesicMiles)
+
+    def geocode(self, address):
+        if self.cache is None:
+            return self._resolve(address)
+        return self.cache.geocode(address, self._resolve)
+
+    def coordinates(self, loc):
+        latlong = (loc.latitude, loc.longitude)
+        if any(l is None for l in latlong):
+            latlong = self.geocode(', '.join(value or '' for value in (loc.street, loc.city, loc.state, loc.zip)))
+            if latlong is None:
+                latlong = self.geocode(loc.zip)
+        return None if latlong is None else tuple(latlong)
+
+    def distance(self, latlong):
+        if latlong not in self.distances:
+            self.distances[latlong] = self.engine.distance(latlong)
+        return self.distances[latlong]
+
+    def accept(self, loc):
+        """Distance to ``loc`` when it satisfies the restrictions, otherwise None
+        """
+        key = storeKey(loc)
+        verdict = self.verdicts.get(key, _UNSEEN)
+        if verdict is _UNSEEN:
+            verdict = self.verdicts[key] = self._judge(loc)
+        return verdict
+
+    def _judge(self, loc):
+        if not self.compiled.admits(loc.city, loc.zip):
+            return None
+        latlong = self.coordinates(loc)
+        if latlong is None:
+            return None
+        return self._within(self.distance(latlong))
+
+    def _within(self, distance):
+        if self.compiled.distance is not None and distance > self.compiled.distance:
+            return None
+        return distance
+
+    def apply(self, locations):
+        with metrics.timed("filter"):
+            return self._apply(locations)
+
+    def _apply(self, locations):
+        # 1. reuse the verdict of every store seen on an earlier poll
+        # 2. filter out the new locations by restricted city and zip
+        # 3. calculate the distance to home for every remaining location in
+        #    one batch of coordinate columns, skipping those outside the
+        #    radius' bounding box
+        # 4. filter out the location if greater than the restricted distance
+        # return copies of the remaining locations carrying their distance
+
+        accepted = []
+        candidates = []
+        unknown = []
+        for loc in locations:
+            key = storeKey(loc)
+            verdict = self.verdicts.get(key, _UNSEEN)
+            if verdict is not _UNSEEN:
+                if verdict is not None:
+                    accepted.append((loc, key))
+                continue
+            latlong = None
+            if self.compiled.admits(loc.city, loc.zip):
+                latlong = self.coordinates(loc)
+            if latlong is None:
+                self.verdicts[key] = None
+                continue
+            accepted.append((loc, key))
+            candidates.append((key, latlong))
+            if latlong not in self.distances:
+                unknown.append(latlong)
+
+        if unknown:
+            unknown = list(dict.fromkeys(unknown))
+            latitudes = array("d", (latlong[0] for latlong in unknown))
+            longitudes = array("d", (latlong[1] for latlong in unknown))
+            self.distances.update(zip(unknown, self.engine.distancesOf(latitudes, longitudes)))
+
+        for key, latlong in candidates:
+            self.verdicts[key] = self._within(self.distances[latlong])
+
+        results = []
+        for loc, key in accepted:
+            distance = self.verdicts[key]
+            if distance is not None:
+                results.append(loc.located(distance))
+
+        return results
@@ -0,0 +1,101 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+def defaultCacheDir():
+    """Per-user cache directory shared by every farquaad process on the host
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "farquaad")
+
+
+def normalizeAddress(address):
+    address = re.sub(r"\s*,\s*", ", ", address.strip().lower())
+    return re.sub(r"\s+", " ", address)
+
+
+def coordinateKey(latlong):
+    # ~1m of precision, plenty to tell two stores apart
+    return "{:.5f},{:.5f}".format(*latlong)
+
+
+class GeoCache(object):
+    """Persistent geocode and distance cache backed by SQLite
+
+    Geocodes are keyed by normalized address and distances by the coordinates
+    of both ends, so the cache survives store renames and is safe to share
+    between processes. Entries older than ``ttl`` seconds are ignored and each
+    table is trimmed to ``maxEntries`` rows, least recently used first.
+    """
+
+    def __init__(self, directory=None, ttl=30 * 24 * 3600, maxEntries=10000):
+        directory = directory or defaultCacheDir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "geocache.sqlite")
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            "key TEXT PRIMARY KEY, latitude REAL, longitude REAL, created REAL, accessed REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS distance ("
+            "key TEXT PRIMARY KEY, miles REAL, created REAL, accessed REAL)"
+        )
+
+    def _get(self, table, columns, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {columns} FROM {table} WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                self._db.execute(f"UPDATE {table} SET accessed = ? WHERE key = ?", (now, key))
+        return row
+
+    def _put(self, table, key, values):
+        now = time.time()
+        marks = ", ".join("?" * (len(values) + 3))
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO {table} VALUES ({marks})", (key, *values, now, now))
+            self._db.execute(
+                f"DELETE FROM {table} WHERE key IN "
+                f"(SELECT key FROM {table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.maxEntries,),
+            )
+
+    def geocode(self, address, resolve):
+        """Coordinates of ``address``, calling ``resolve(address)`` on a miss
+
+        ``resolve`` returns a (latitude, longitude) tuple or None; a None result
+        is cached as well so unresolvable addresses are not retried every start.
+        """
+        key = normalizeAddress(address)
+        row = self._get("geocode", "latitude, longitude", key)
+        if row is not None:
+            return None if row[0] is None else row
+        latlong = resolve(address)
+        self._put("geocode", key, (None, None) if latlong is None else tuple(latlong))
+        return latlong
+
+    def distance(self, origin, destination, measure):
+        """Miles between two coordinates, calling ``measure(origin, destination)`` on a miss
+        """
+        key = coordinateKey(origin) + "|" + coordinateKey(destination)
+        row = self._get("distance", "miles", key)
+        if row is not None:
+            return row[0]
+        miles = measure(origin, destination)
+        self._put("distance", key, (miles,))
+        return miles
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,84 @@
+import time
+from collections import Counter
+
+from .metrics import metrics
+
+START = "start"
+LOADED = "appointment loaded"
+SLOT_CHOSEN = "slot chosen"
+PATIENT_LOADED = "patient loaded"
+PATIENT_FILLED = "patient filled"
+SUBMITTED = "submitted"
+CONFIRMED = "confirmed"
+# submitted, but the confirmation never showed: the booking may have gone through
+UNCONFIRMED = "unconfirmed"
+FAILED = "failed"
+# states a journey ends in
+ENDS = (CONFIRMED, UNCONFIRMED, FAILED)
+# times a state may be entered again after its first visit
+RETRIES = 2
+
+
+class UnconfirmedBooking(Exception):
+    """A booking was submitted but never confirmed, trying elsewhere could book the patient twice"""
+
+
+class Journey(object):
+    """A booking attempt as explicit states, resumed from the furthest checkpoint
+
+    Each state has a step, registered with on(), that acts on the page and
+    returns the state it got to: the next one when it worked, or the state
+    to resume from when it didn't. A patient form that failed to fill is
+    filled again where it is, a slot taken in the meantime is replaced by
+    another on the same appointment page, and only a page with nothing
+    left starts over. A step raising is retried from the same state. The
+    attempt fails once a state has used up its ``retries`` or a step
+    returns FAILED, and ends UNCONFIRMED when a step can't tell whether the
+    booking went through. A step registered ``once`` is never run twice, raising
+    or coming back to it fails the attempt: for steps that can't safely be
+    repeated, like submitting the booking.
+    """
+
+    def __init__(self, logger, retries=RETRIES, clock=time.monotonic):
+        self.retries = retries
+        self.state = START
+        self._logger = logger
+        self._clock = clock
+        self._steps = {}
+        self._once = set()
+        self.visits = Counter()
+        # (state, seconds since the start) of every state reached
+        self.checkpoints = []
+
+    def on(self, state, step, once=False):
+        self._steps[state] = step
+        if once:
+            self._once.add(state)
+        return self
+
+    def _enter(self, state):
+        self.state = state
+        self.checkpoints.append((state, self._clock() - self._started))
+
+    def run(self):
+        """Step until one of the ENDS, True once confirmed
+        """
+        self._started = self._clock()
+        while self.state not in ENDS:
+            state = self.state
+            if self.visits[state] > (0 if state in self._once else self.retries):
+                self._logger.info(f"Giving up booking, {state} failed {self.visits[state]} times")
+                self._enter(FAILED)
+                break
+            if self.visits[state]:
+                metrics.count("journey_retries_total", state=state)
+            self.visits[state] += 1
+            try:
+                self._enter(self._steps[state]())
+            except Exception as e:
+                self._logger.info(f"Booking step from {state} failed: {e}")
+                self._enter(FAILED if state in self._once else state)
+        return self.state == CONFIRMED
+
+    def describe(self):
+        return " -> ".join(f"{state} ({seconds:.1f}s)" for state, seconds in self.checkpoints)
@@ -0,0 +1,79 @@
+import sys
+
+# the feed fields a Location keeps, everything else the feed returns is dropped
+FIELDS = ("name", "street", "city", "state", "zip", "latitude", "longitude", "openTimeslots", "url", "distance")
+# strings repeated across every poll, shared through the interpreter's intern table
+INTERNED = ("name", "street", "city", "state", "zip")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+class Location(object):
+    """One store of the availability feed, built once when the feed is parsed
+
+    A slotted record holds only the fields the monitor uses, with the strings
+    repeated on every poll interned and the coordinates as floats, so a
+    snapshot costs a fraction of the decoded JSON. Filtering never mutates a
+    Location: ``located`` returns a copy carrying the distance from home.
+    Item access (``loc["name"]``, ``dict(loc)``) keeps working like the feed dicts.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, name, street=None, city=None, state=None, zip=None, latitude=None, longitude=None,
+                 openTimeslots=0, url=None, distance=None):
+        self.name = _intern(name)
+        self.street = _intern(street)
+        self.city = _intern(city)
+        self.state = _intern(state)
+        self.zip = _intern(zip)
+        self.latitude = _float(latitude)
+        self.longitude = _float(longitude)
+        self.openTimeslots = int(openTimeslots or 0)
+        self.url = url
+        self.distance = distance
+
+    @classmethod
+    def fromFeed(cls, record):
+        """Location of a decoded feed (or recording) record
+        """
+        return cls(**{field: record[field] for field in FIELDS if field in record})
+
+    def located(self, distance):
+        """Copy of this location ``distance`` miles from home
+        """
+        loc = Location.__new__(Location)
+        for field in FIELDS:
+            setattr(loc, field, getattr(self, field))
+        loc.distance = distance
+        return loc
+
+    def keys(self):
+        return [field for field in FIELDS if field != "distance" or self.distance is not None]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in FIELDS else default
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __eq__(self, other):
+        if not isinstance(other, Location):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Location({self.name!r}, openTimeslots={self.openTimeslots}, distance={self.distance})"
@@ -0,0 +1,124 @@
+import math
+from collections import defaultdict
+
+from .restrictions import normalizeCity, normalizeZip
+from .snapshot import CLOSED, Ranking
+
+# size of the spatial grid cells patients are indexed under, in degrees
+GRID_DEGREES = 0.5
+
+
+def gridCell(latlong):
+    return (math.floor(latlong[0] / GRID_DEGREES), math.floor(latlong[1] / GRID_DEGREES))
+
+
+class Patient(object):
+    """One patient of a batch run: the form data plus its own search restrictions
+    """
+
+    def __init__(self, key, data, refine):
+        self.key = key
+        self.data = data
+        self.refine = refine
+
+    @property
+    def name(self):
+        return " ".join(self.data.get(field, "") for field in ("firstname", "lastname")).strip() or str(self.key)
+
+
+class PatientIndex(object):
+    """Routes feed changes to the patients whose restrictions they satisfy
+
+    Each patient is indexed under its most selective restriction: its zip codes
+    and zip prefixes, else its cities, else the grid cells covering its distance radius. A store
+    opening is then only checked against the patients found under its zip, city
+    and cell, so matching costs follow the openings rather than patients times
+    locations. Every patient keeps its own distance ranked list of matches.
+    """
+
+    def __init__(self, locate):
+        self._locate = locate
+        self._patients = {}
+        self._byZip = defaultdict(set)
+        self._byCity = defaultdict(set)
+        self._byCell = defaultdict(set)
+        self._anywhere = set()
+        # lengths of the zip prefixes patients are indexed under
+        self._prefixLengths = set()
+        self._rankings = {}
+        # store -> keys of the patients it is ranked for, so closings are cheap
+        self._stores = defaultdict(set)
+
+    def _buckets(self, patient):
+        compiled = patient.refine.compiled
+        if compiled.zipcodes or compiled.prefixes:
+            self._prefixLengths.update(len(prefix) for prefix in compiled.prefixes)
+            return [self._byZip[z] for z in compiled.zipKeys()]
+        if compiled.cities:
+            return [self._byCity[c] for c in compiled.cities]
+        box = patient.refine.engine.box
+        if box is None or box[3] - box[2] >= 360:
+            return [self._anywhere]
+        south, north = gridCell((box[0], box[2])), gridCell((box[1], box[3]))
+        return [
+            self._byCell[(lat, lon)]
+            for lat in range(south[0], north[0] + 1)
+            for lon in range(south[1], north[1] + 1)
+        ]
+
+    def add(self, patient):
+        self._patients[patient.key] = patient
+        self._rankings[patient.key] = Ranking()
+        for bucket in self._buckets(patient):
+            bucket.add(patient.key)
+
+    def remove(self, key):
+        patient = self._patients.pop(key)
+        for bucket in self._buckets(patient):
+            bucket.discard(key)
+        for loc in self._rankings.pop(key).list():
+            self._stores[loc.name].discard(key)
+
+    def patient(self, key):
+        return self._patients[key]
+
+    def ranking(self, key):
+        return self._rankings[key].list()
+
+    def candidates(self, loc):
+        zipcode = normalizeZip(loc.zip) or ""
+        keys = self._anywhere | self._byZip.get(zipcode, set()) | self._byCity.get(normalizeCity(loc.city), set())
+        for length in self._prefixLengths:
+            keys = keys | self._byZip.get(zipcode[:length], set())
+        if self._byCell:
+            latlong = self._locate(loc)
+            if latlong is not None:
+                keys = keys | self._byCell.get(gridCell(latlong), set())
+        return keys
+
+    def update(self, changes):
+        """Apply a list of snapshot Changes and return the keys of patients with new matches
+        """
+        matched = set()
+        for change in changes:
+            store = change.store
+            if change.kind == CLOSED:
+                for key in self._stores.pop(store, ()):
+                    self._rankings[key].remove(store)
+                continue
+            for key in self.candidates(change.location):
+                distance = self._patients[key].refine.accept(change.location)
+                if distance is None:
+                    if self._rankings[key].remove(store) is not None:
+                        self._stores[store].discard(key)
+                    continue
+                self._rankings[key].put(store, change.location.located(distance))
+                self._stores[store].add(key)
+                matched.add(key)
+        return matched
+
+    def __len__(self):
+        return len(self._patients)
+
+    def __iter__(self):
+        return iter(list(self._patients.values()))
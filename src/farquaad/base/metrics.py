@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# observations kept per histogram for the exact quantiles of the summary
+SAMPLES = 1000
+
+
+class Histogram(object):
+    """Cumulative latency histogram with Prometheus style buckets
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def quantile(self, q):
+        """``q`` quantile of the most recent observations, 0.0 when there are none
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) pairs, ending with +Inf
+        """
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+def _key(name, labels):
+    # label values are rendered as text anyway, and an int status next to
+    # "error" would otherwise make the keys unsortable
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metrics(object):
+    """Thread safe registry of the counters and latency histograms of a run
+
+    Every booking pipeline phase (feed fetch and parse, filter, sort, page load,
+    form fill, submit) is timed into the ``phase_seconds`` histogram, labelled
+    by phase, with timed(); notable events are counted with count(). The
+    registry renders itself in the Prometheus text format and as a summary.
+    """
+
+    def __init__(self, prefix="farquaad"):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the body of the with statement into the ``name`` histogram
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, phase):
+        return self.span("phase_seconds", phase=phase)
+
+    def counter(self, name, **labels):
+        return self._counters.get(_key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get(_key(name, labels))
+
+    def phases(self):
+        """Phase name -> Histogram of everything recorded with timed()
+        """
+        with self._lock:
+            return {dict(labels)["phase"]: histogram for (name, labels), histogram in self._histograms.items() if name == "phase_seconds"}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """The registry in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {self.prefix}_{name} counter")
+                for (other, labels), value in sorted(self._counters.items()):
+                    if other == name:
+                        lines.append(f"{self.prefix}_{name}{_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for (other, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if other != name:
+                        continue
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{self.prefix}_{name}_bucket{_labels(labels + (('le', le),))} {total}")
+                    lines.append(f"{self.prefix}_{name}_sum{_labels(labels)} {histogram.sum}")
+                    lines.append(f"{self.prefix}_{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically replace ``path`` with the rendered registry, for node_exporter's textfile collector
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as out:
+            out.write(self.render())
+        os.replace(temporary, path)
+
+    def summary(self):
+        """Human readable lines: count, p50, p95 and max of every histogram, then the counters
+        """
+        lines = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                label = ",".join(str(value) for _, value in labels) or name
+                lines.append(
+                    f"{label:18} n={histogram.count:<5} p50={histogram.quantile(0.5):.3f}s "
+                    f"p95={histogram.quantile(0.95):.3f}s max={histogram.max:.3f}s"
+                )
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return lines
+
+
+class Exporter(object):
+    """Publishes a Metrics registry while the run is going
+
+    With ``port`` the registry is served for Prometheus to scrape at any path
+    of http://localhost:port/; with ``path`` it is rewritten every ``interval``
+    seconds and once more on close().
+    """
+
+    def __init__(self, metrics, path=None, port=None, interval=15.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._server = None
+        self._threads = []
+        if port is not None:
+            from http.server import ThreadingHTTPServer
+            self._server = ThreadingHTTPServer(("", port), self._handler())
+            self._start(self._server.serve_forever)
+        if path is not None:
+            self._start(self._writeEvery)
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _start(self, target):
+        thread = threading.Thread(target=target, name="farquaad-metrics", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _writeEvery(self):
+        while not self._stopped.wait(self.interval):
+            self.metrics.write(self.path)
+
+    @property
+    def port(self):
+        return None if self._server is None else self._server.server_address[1]
+
+    def close(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.path is not None:
+            self.metrics.write(self.path)
+
+
+# the registry the booking pipeline records into
+metrics = Metrics()
@@ -0,0 +1,342 @@
+import math
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .metrics import metrics
+
+# Lightning comboboxes only render their items once opened, so opening one and
+# listing its items is done in a single script instead of a click plus a search
+EXPAND_SCRIPT = """
+var xpath = function (path) {
+    return document.evaluate(path, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+};
+var combo = xpath(arguments[0]).snapshotItem(0);
+if (combo === null) {
+    return null;
+}
+combo.scrollIntoView();
+(combo.querySelector("button, input, [role='combobox']") || combo).click();
+var items = xpath(arguments[1]);
+var options = [];
+for (var i = 0; i < items.snapshotLength; i++) {
+    var item = items.snapshotItem(i);
+    options.push({element: item, value: item.getAttribute("data-value"), label: item.textContent.trim()});
+}
+return options;
+"""
+
+# sets every field and picks every combobox item in one asynchronous script,
+# the way a user would: native value setter plus the input/change events the
+# Lightning components listen for, then reads the fields back for verification
+FILL_SCRIPT = """
+var fields = arguments[0], choices = arguments[1], done = arguments[arguments.length - 1];
+var find = function (path) {
+    return document.evaluate(path, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+};
+var setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+var missing = [];
+var fill = function () {
+    fields.forEach(function (field) {
+        var input = find(field[0]);
+        if (input === null) {
+            missing.push(field[0]);
+            return;
+        }
+        input.scrollIntoView();
+        input.focus();
+        setValue.call(input, field[1]);
+        input.dispatchEvent(new Event("input", {bubbles: true, composed: true}));
+        input.dispatchEvent(new Event("change", {bubbles: true, composed: true}));
+        input.blur();
+    });
+    // let the components re-render before reading the values back
+    setTimeout(function () {
+        done({
+            missing: missing,
+            values: fields.map(function (field) {
+                var input = find(field[0]);
+                return input === null ? null : input.value;
+            })
+        });
+    }, 0);
+};
+var choose = function (i) {
+    if (i >= choices.length) {
+        fill();
+        return;
+    }
+    var combo = find(choices[i][0]);
+    if (combo === null) {
+        missing.push(choices[i][0]);
+        choose(i + 1);
+        return;
+    }
+    combo.scrollIntoView();
+    (combo.querySelector("button, input, [role='combobox']") || combo).click();
+    // the items only render once the combobox is open
+    setTimeout(function () {
+        var item = find(choices[i][1]);
+        if (item === null) {
+            missing.push(choices[i][1]);
+        } else {
+            item.click();
+        }
+        setTimeout(function () { choose(i + 1); }, 0);
+    }, 0);
+};
+choose(0);
+"""
+
+# resolves with the index of the first xpath present in the page, re-checking
+# on every DOM mutation instead of polling, or -1 once the timeout expires
+WAIT_SCRIPT = """
+var paths = arguments[0], timeout = arguments[1] * 1000, done = arguments[arguments.length - 1];
+var present = function () {
+    for (var i = 0; i < paths.length; i++) {
+        if (document.evaluate(paths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null) {
+            return i;
+        }
+    }
+    return -1;
+};
+var found = present();
+if (found >= 0) {
+    done(found);
+    return;
+}
+var timer = null;
+var observer = new MutationObserver(function () {
+    var found = present();
+    if (found >= 0) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(found);
+    }
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function () {
+    observer.disconnect();
+    done(-1);
+}, timeout);
+"""
+
+# granularity of Selenium's WebDriverWait, what event driven waits are compared against
+POLL_FREQUENCY = 0.5
+
+def instrument(driver):
+    """Count every WebDriver command sent through ``driver`` in ``driver.farquaadCommands``
+    """
+    if driver is None or hasattr(driver, "farquaadCommands"):
+        return
+    driver.farquaadCommands = 0
+    execute = driver.execute
+
+    def counted(command, params=None):
+        driver.farquaadCommands += 1
+        return execute(command, params)
+
+    driver.execute = counted
+
+def commandCount(driver):
+    return getattr(driver, "farquaadCommands", 0)
+
+class Page:
+    """Base class for defining common page interaction elements
+    """
+
+    def __init__(self, driver, logger):
+        self._driver = driver
+        self._logger = logger
+        # xpath -> element resolved since the last load()
+        self._handles = {}
+        # (step, seconds) of every wait
+        self.timings = []
+        self.timeouts = {}
+        instrument(driver)
+
+    def handle(self, xpath):
+        element = self._handles.get(xpath)
+        if element is None:
+            element = self._handles[xpath] = self.find(xpath)
+        return element
+
+    def _act(self, xpath, action):
+        try:
+            return action(self.handle(xpath))
+        except StaleElementReferenceException:
+            # the component re-rendered since we resolved it
+            self._handles.pop(xpath, None)
+            return action(self.handle(xpath))
+    
+    def clickOn(self, xpath):
+        return self._act(xpath, lambda element: element.click())
+    
+    def sendKeys(self, xpath, value, clear=False):
+        def type(element):
+            if clear:
+                element.clear()
+            return element.send_keys(value)
+        return self._act(xpath, type)
+
+    def timeout(self, step, default=10):
+        """Seconds allowed for ``step``, from the per distributor ``timeouts`` budget
+        """
+        return self.timeouts.get(step, default)
+
+    def _scriptTimeout(self, seconds):
+        if getattr(self._driver, "farquaadScriptTimeout", 0) < seconds:
+            self._driver.set_script_timeout(seconds)
+            self._driver.farquaadScriptTimeout = seconds
+
+    def wait(self, waitxpath, waittime=10, alternatives=(), step=None):
+        """Block until ``waitxpath``, or one of ``alternatives``, is in the page
+
+        An in-page MutationObserver resolves the moment the element appears
+        rather than on Selenium's 500ms polling. The time taken is recorded in
+        ``timings`` under ``step``.
+
+        Returns:
+          str: the xpath that appeared
+
+        Raises:
+          TimeoutException: none of them appeared within ``waittime`` seconds
+        """
+        paths = [waitxpath, *alternatives]
+        started = time.monotonic()
+        try:
+            self._scriptTimeout(waittime + 5)
+            found = self._driver.execute_async_script(WAIT_SCRIPT, paths, waittime)
+        except TimeoutException:
+            found = -1
+        except WebDriverException as e:
+            # no usable script support on this page, poll quickly instead
+            self._logger.debug(f"Event driven wait unavailable: {e}")
+            def condition(driver):
+                # the path itself, as until() takes an index of 0 for not found
+                return next((path for path in paths if driver.find_elements_by_xpath(path)), False)
+            try:
+                found = paths.index(WebDriverWait(self._driver, waittime, poll_frequency=0.05).until(condition))
+            except TimeoutException:
+                found = -1
+        elapsed = time.monotonic() - started
+        self.timings.append((step or waitxpath, elapsed))
+        if found < 0:
+            raise TimeoutException(f"None of {paths} appeared within {waittime}s")
+        return paths[found]
+    
+    def load(self, url, waitxpath, waittime=10, alternatives=(), navigate=True):
+        """Open ``url`` and wait for ``waitxpath``; without ``navigate`` the
+        current tab already shows ``url`` (e.g. preloaded) and is only waited on
+        """
+        with metrics.timed("page_load"):
+            return self._load(url, waitxpath, waittime, alternatives, navigate)
+
+    def _load(self, url, waitxpath, waittime, alternatives, navigate=True):
+        self._handles.clear()
+        if navigate:
+            started = time.monotonic()
+            self._driver.get(url)
+            self.timings.append(("navigate", time.monotonic() - started))
+        try:
+            return self.wait(waitxpath, waittime=waittime, alternatives=alternatives, step="load")
+        except TimeoutException:
+            self._logger.info(f"Failed to fully load {url} within {waittime}s")
+            return False
+
+    def breakdown(self):
+        """Summary of the recorded waits, with the time polling every 500ms would have added
+        """
+        steps = []
+        saved = 0.0
+        for step, elapsed in self.timings:
+            polled = math.ceil(elapsed / POLL_FREQUENCY) * POLL_FREQUENCY if step != "navigate" else elapsed
+            saved += polled - elapsed
+            steps.append(f"{step} {elapsed:.2f}s")
+        return f"{', '.join(steps)} (~{saved:.2f}s saved over polling)"
+
+    def find(self, xpath):
+        return self._driver.find_element_by_xpath(xpath)
+    
+    def findAll(self, xpath):
+        return self._driver.find_elements_by_xpath(xpath)
+    
+    def scrollTo(self, xpath, click=False):
+        def scroll(element):
+            self._driver.execute_script("arguments[0].scrollIntoView();", element)
+            if click:
+                element.click()
+        self._act(xpath, scroll)
+
+    def expand(self, comboxpath, itemsxpath):
+        """Open a combobox and list its items in one round trip
+
+        Returns a list of dicts with the item ``element``, its ``value`` and
+        ``label``, or None when the combobox is not on the page.
+        """
+        return self._driver.execute_script(EXPAND_SCRIPT, comboxpath, itemsxpath)
+
+    def fill(self, fields, choices=(), timeout=5):
+        """Fill a form in one round trip
+
+        Args:
+          fields (list): (xpath, value) pairs of text inputs to set
+          choices (list): (comboxpath, itemxpath) pairs of combobox items to pick,
+            picked before the fields are set
+          timeout (int): seconds the script may take
+
+        Returns:
+          bool: every element was found and every field reads back its value
+        """
+        self._scriptTimeout(timeout)
+        # an xpath listed twice ends up with its last value
+        fields = list(dict(fields).items())
+        try:
+            result = self._driver.execute_async_script(FILL_SCRIPT, [list(f) for f in fields], [list(c) for c in choices])
+        except WebDriverException as e:
+            self._logger.info(f"Scripted fill failed: {e}")
+            return False
+        if result["missing"]:
+            self._logger.info(f"Scripted fill could not find {result['missing']}")
+            return False
+        for (xpath, value), actual in zip(fields, result["values"]):
+            if actual != value:
+                self._logger.info(f"Scripted fill of {xpath} reads back {actual!r}")
+                return False
+        return True
+
+    @property
+    def commands(self):
+        """WebDriver commands sent through this page's driver so far
+        """
+        return commandCount(self._driver)
+    
+    def isPresent(self, xpath):
+        try:
+            return self.find(xpath)
+        except NoSuchElementException:
+            return False
+    
+    def populate(self):
+        return True
+    
+    def capture(self, filename, xpath="html"):
+        return self.find(xpath).screenshot(filename)
+
+    def screenshot(self, xpath="html"):
+        """PNG bytes of ``xpath``, leaving the encoding and writing to the caller
+        """
+        return self.find(xpath).screenshot_as_png
+
+    def quit(self):
+        return self._driver.quit()
+
+    def driver(self):
+        return self._driver
+
+    def proceed(self):
+        return True
@@ -0,0 +1,131 @@
+import time
+from collections import OrderedDict
+
+from .metrics import metrics
+
+# tabs kept preloading behind the one being booked
+SIZE = 2
+# seconds after which a preloaded page is reloaded, so its slots aren't stale
+REFRESH = 60.0
+# opens the page in a new tab without waiting for it to load
+OPEN_SCRIPT = "window.open(arguments[0], '_blank');"
+
+
+class Prefetcher(object):
+    """Preloads the booking pages of the next best candidates in background tabs
+
+    Each update() gets the current ranking, nearest first. The nearest
+    candidate is the one about to be booked, so only the ``size`` behind it
+    get a tab: the page is opened with window.open() and loads while the
+    browser keeps working on the foreground tab. Tabs of stores that dropped
+    out of the ranking are closed and tabs older than ``refresh`` seconds are
+    reloaded. claim() switches a booking attempt onto the tab preloaded for
+    its store, which becomes the browser's main tab.
+
+    The driver is only ever used from the thread calling update() and claim().
+    """
+
+    def __init__(self, logger, size=SIZE, refresh=REFRESH, clock=time.monotonic):
+        self.size = size
+        self.refresh = refresh
+        self._logger = logger
+        self._clock = clock
+        self._driver = None
+        self._home = None
+        # url -> [window handle, monotonic time it was (re)loaded]
+        self.tabs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # seconds taken by the loads of booking pages that were / weren't preloaded
+        self.warm = []
+        self.cold = []
+
+    def _attach(self, driver):
+        if driver is not self._driver:
+            self._driver = driver
+            self._home = driver.current_window_handle
+            self.tabs.clear()
+
+    def _switch(self, handle):
+        self._driver.switch_to.window(handle)
+
+    def _open(self, url):
+        before = set(self._driver.window_handles)
+        self._driver.execute_script(OPEN_SCRIPT, url)
+        opened = set(self._driver.window_handles) - before
+        if not opened:
+            self._logger.info(f"The browser refused to open a tab for {url}")
+            return
+        self.tabs[url] = [opened.pop(), self._clock()]
+
+    def _close(self, url):
+        handle, _ = self.tabs.pop(url)
+        self._switch(handle)
+        self._driver.close()
+        self._switch(self._home)
+
+    def _reload(self, url):
+        tab = self.tabs[url]
+        self._switch(tab[0])
+        # navigating by script returns at once, the page reloads in the background
+        self._driver.execute_script("location.reload();")
+        self._switch(self._home)
+        tab[1] = self._clock()
+
+    def update(self, driver, ranked):
+        """Preload the pages of the candidates following the first of ``ranked``
+        """
+        self._attach(driver)
+        urls = [loc.url for loc in ranked if loc.url]
+        wanted = set(urls[:self.size + 1])
+        for url in [url for url in self.tabs if url not in wanted]:
+            self._close(url)
+        now = self._clock()
+        for url in urls[1:self.size + 1]:
+            if url not in self.tabs:
+                self._open(url)
+            elif now - self.tabs[url][1] >= self.refresh:
+                self._reload(url)
+
+    def claim(self, driver, openSlot):
+        """Switch ``driver`` to the tab preloaded for ``openSlot``, True if there was one
+
+        The tab the browser was on is closed: the preloaded one takes its place.
+        """
+        tab = self.tabs.pop(openSlot.url, None) if driver is self._driver else None
+        metrics.count("prefetch_total", result="miss" if tab is None else "hit")
+        if tab is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        self._switch(self._home)
+        self._driver.close()
+        self._home = tab[0]
+        self._switch(self._home)
+        return True
+
+    def loaded(self, prefetched, seconds):
+        """Record how long the booking page took to be ready, preloaded or not
+        """
+        (self.warm if prefetched else self.cold).append(seconds)
+
+    def stats(self):
+        attempts = self.hits + self.misses
+        saved = 0.0
+        if self.warm and self.cold:
+            saved = (sum(self.cold) / len(self.cold) - sum(self.warm) / len(self.warm)) * len(self.warm)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / attempts if attempts else 0.0,
+            "open": len(self.tabs),
+            "savedSeconds": saved,
+        }
+
+    def close(self):
+        """Close every preloaded tab
+        """
+        if self._driver is None:
+            return
+        for url in list(self.tabs):
+            self._close(url)
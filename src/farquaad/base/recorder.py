@@ -0,0 +1,76 @@
+import gzip
+import json
+import time
+
+# every this many records the full snapshot is written instead of a delta
+KEYFRAME = 100
+
+
+class FeedRecorder(object):
+    """Persists every availability snapshot seen while monitoring
+
+    The recording is gzip compressed JSON lines. A keyframe line holds the
+    whole snapshot, ``{"t": time, "full": [locations]}``, and the lines in
+    between only what changed since the previous snapshot,
+    ``{"t": time, "set": [locations], "del": [names]}``, keyed by the location
+    name like Snapshot. Appending to an existing recording starts with a
+    keyframe, so recordings of several runs can share one file. Records are
+    flushed every keyframe and on close(); a run killed in between loses at
+    most the records since the last flush.
+    """
+
+    def __init__(self, path, keyframe=KEYFRAME):
+        self.path = path
+        self.keyframe = keyframe
+        self.records = 0
+        self._previous = None
+        self._out = gzip.open(path, "at", encoding="utf-8")
+
+    def record(self, locations, at=None):
+        at = time.time() if at is None else at
+        locations = [dict(loc) for loc in locations]
+        current = {loc["name"]: loc for loc in locations}
+        if self._previous is None or self.records % self.keyframe == 0:
+            line = {"t": at, "full": locations}
+        else:
+            line = {
+                "t": at,
+                "set": [loc for name, loc in current.items() if self._previous.get(name) != loc],
+                "del": [name for name in self._previous if name not in current],
+            }
+        self._out.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.records += 1
+        self._previous = current
+        if self.records % self.keyframe == 0:
+            self._out.flush()
+
+    def close(self):
+        self._out.close()
+
+
+def readRecording(path):
+    """Yield (timestamp, locations) for every snapshot of a FeedRecorder file
+
+    A recording cut short by a killed run is read up to its last flushed record.
+    """
+    current = {}
+    with gzip.open(path, "rt", encoding="utf-8") as recording:
+        for line in _complete(recording):
+            record = json.loads(line)
+            if "full" in record:
+                current = {loc["name"]: loc for loc in record["full"]}
+            else:
+                for name in record["del"]:
+                    current.pop(name, None)
+                current.update((loc["name"], loc) for loc in record["set"])
+            yield record["t"], list(current.values())
+
+
+def _complete(recording):
+    try:
+        for line in recording:
+            if not line.endswith("\n"):
+                return
+            yield line
+    except EOFError:
+        return
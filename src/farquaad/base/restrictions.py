@@ -0,0 +1,58 @@
+ZIP_DIGITS = 5
+
+
+def normalizeCity(city):
+    return None if city is None else " ".join(city.split()).casefold()
+
+
+def normalizeZip(zipcode):
+    # ZIP+4 codes match on their first five digits
+    return None if zipcode is None else str(zipcode).strip()[:ZIP_DIGITS]
+
+
+class CompiledRestrictions(object):
+    """Restrictions turned into set lookups, built once per Filter
+
+    Cities are matched case and whitespace insensitively against a frozenset.
+    Zip codes are exact five digit codes, or prefixes covering a range of them:
+    ``787*`` or any code shorter than five digits. The verdict for every
+    (city, zip) pair seen is remembered, so the feed's stores cost one dict
+    lookup each after their first poll. None leaves a restriction unset.
+    """
+
+    def __init__(self, restrictions):
+        self.distance = restrictions.distance
+        self.cities = None
+        if restrictions.cities is not None:
+            self.cities = frozenset(normalizeCity(city) for city in restrictions.cities)
+        self.zipcodes = None
+        self.prefixes = ()
+        if restrictions.zipcodes is not None:
+            codes = [str(code).strip() for code in restrictions.zipcodes]
+            prefixes = {code.rstrip("*") for code in codes if code.endswith("*") or len(code) < ZIP_DIGITS}
+            self.zipcodes = frozenset(normalizeZip(code) for code in codes if not code.endswith("*")) - prefixes
+            self.prefixes = tuple(sorted(prefixes))
+        # (city, zip) -> whether a store there satisfies the city and zip restrictions
+        self._places = {}
+
+    def _admits(self, city, zipcode):
+        if self.cities is not None and normalizeCity(city) not in self.cities:
+            return False
+        if self.zipcodes is None:
+            return True
+        zipcode = normalizeZip(zipcode)
+        return zipcode in self.zipcodes or (zipcode is not None and zipcode.startswith(self.prefixes))
+
+    def admits(self, city, zipcode):
+        place = (city, zipcode)
+        admitted = self._places.get(place)
+        if admitted is None:
+            admitted = self._places[place] = self._admits(city, zipcode)
+        return admitted
+
+    def zipKeys(self):
+        """Exact zip codes and prefixes a store must match, None when zips are unrestricted
+        """
+        if self.zipcodes is None:
+            return None
+        return self.zipcodes | frozenset(self.prefixes)
@@ -0,0 +1,113 @@
+import random
+import time
+from collections import deque
+
+
+class PollScheduler(object):
+    """Fixed delay between polls, the classic --time-delay behavior
+
+    Schedulers decide how long to wait before each poll and are told what
+    the poll found through observe(); stats() summarizes both.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.polls = 0
+        self.hits = 0
+        self.errors = 0
+        # the most recent intervals, for the min and max of the stats
+        self.intervals = deque(maxlen=1000)
+        self.waits = 0
+        self._slept = 0.0
+
+    def interval(self):
+        return self.delay
+
+    def next(self):
+        """The interval to wait before the next poll, recorded in the stats
+        """
+        interval = self.interval()
+        self.intervals.append(interval)
+        self.waits += 1
+        self._slept += interval
+        return interval
+
+    def wait(self):
+        time.sleep(self.next())
+
+    def observe(self, changed, status=200, slots=None):
+        """Record the outcome of a poll
+
+        Args:
+          changed (bool): the feed had new content
+          status (int): HTTP status of the poll, None when the request failed
+          slots (int): total open slots in the feed, when known
+        """
+        self.polls += 1
+        if changed:
+            self.hits += 1
+        if status is None or status == 429 or status >= 500:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "polls": self.polls,
+            "hits": self.hits,
+            "errors": self.errors,
+            "hitRate": self.hits / self.polls if self.polls else 0.0,
+            "meanInterval": self._slept / self.waits if self.waits else 0.0,
+            "minInterval": min(self.intervals, default=0.0),
+            "maxInterval": max(self.intervals, default=0.0),
+        }
+
+
+class AdaptiveScheduler(PollScheduler):
+    """Polls fast while the feed is moving and backs off while it is not
+
+    Right after the feed changes, or its open slot count rises, the next
+    ``burstPolls`` polls happen every ``burst`` seconds. A static feed stretches
+    the interval by ``backoff`` up to ``maxDelay``, and errors or 429s back off
+    twice as hard. Backed off intervals are jittered by +/- ``jitter`` so many
+    clients don't synchronize, and no interval is ever shorter than what
+    ``maxRate`` requests per second allows.
+    """
+
+    def __init__(self, delay, burst=None, maxDelay=None, maxRate=1.0, burstPolls=5, backoff=1.5, jitter=0.2):
+        super().__init__(delay)
+        self.burst = burst if burst is not None else delay / 4
+        self.maxDelay = maxDelay if maxDelay is not None else delay * 3
+        self.maxRate = maxRate
+        self.burstPolls = burstPolls
+        self.backoff = backoff
+        self.jitter = jitter
+        self._current = delay
+        self._burstLeft = 0
+        self._slots = None
+        self._random = random.Random()
+
+    def interval(self):
+        interval = self._current
+        if self._burstLeft == 0 and interval > self.delay:
+            interval *= self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.maxRate:
+            interval = max(interval, 1.0 / self.maxRate)
+        return interval
+
+    def observe(self, changed, status=200, slots=None):
+        super().observe(changed, status, slots)
+        rising = slots is not None and self._slots is not None and slots > self._slots
+        if slots is not None:
+            self._slots = slots
+        if status is None or status == 429 or status >= 500:
+            self._burstLeft = 0
+            self._current = min(max(self._current, self.delay) * self.backoff * 2, self.maxDelay)
+        elif changed or rising:
+            self._burstLeft = self.burstPolls
+            self._current = self.burst
+        elif self._burstLeft > 0:
+            self._burstLeft -= 1
+        elif self._current < self.delay:
+            # the burst is over, settle back to the regular delay first
+            self._current = self.delay
+        else:
+            self._current = min(self._current * self.backoff, self.maxDelay)
@@ -0,0 +1,166 @@
+import fcntl
+import mmap
+import os
+import struct
+import time
+
+from .metrics import metrics
+
+# magic, version, body length, publish time, HTTP status of the leader's last poll
+HEADER = struct.Struct("<4sxxxxQQdi")
+MAGIC = b"FQSF"
+VERSION_OFFSET = 8
+STATUS_OFFSET = 32
+# initial room for the feed body, the file grows when a body outgrows it
+CAPACITY = 4 * 1024 * 1024
+# seconds between looks at the version counter while waiting for a change
+WAKE_INTERVAL = 0.05
+# attempts at reading a body the leader isn't half way through writing
+READ_ATTEMPTS = 100
+
+
+class SharedFeed(object):
+    """A feed polled by one process on the host and read by all the others
+
+    Every instance sharing ``path`` tries to take an exclusive lock on
+    ``path.lock``. The instance holding it leads: it polls the distributor
+    through ``poller`` and publishes every changed body into the memory mapped
+    ``path``. The others follow: they never touch the network, and fetch()
+    only copies the body out of the map when the version counter moved. The
+    counter is odd while a body is being written, so a reader never returns
+    a torn body. A follower takes over the polling as soon as the leader's
+    lock is released, for instance because it exited.
+
+    Has the fetch()/stream()/status/close() interface of FeedPoller.
+    """
+
+    def __init__(self, path, poller, logger, capacity=CAPACITY):
+        self.path = path
+        self._poller = poller
+        self._logger = logger
+        # version of the last body returned by fetch()
+        self.version = 0
+        self.leading = False
+        self._lock = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < HEADER.size + capacity:
+            os.ftruncate(self._fd, HEADER.size + capacity)
+        self._map = mmap.mmap(self._fd, 0)
+        self._lead()
+
+    def _lead(self):
+        if self.leading:
+            return True
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.leading = True
+        self._logger.info(f"Polling the feed for every instance sharing {self.path}")
+        return True
+
+    def _remap(self, size):
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map.close()
+        self._map = mmap.mmap(self._fd, 0)
+
+    def _header(self):
+        return HEADER.unpack_from(self._map)
+
+    @property
+    def published(self):
+        """Version of the latest published body, 0 before the first one
+        """
+        magic, version, _, _, _ = self._header()
+        return version if magic == MAGIC else 0
+
+    @property
+    def status(self):
+        if self.leading:
+            return self._poller.status
+        # a follower is only as healthy as the leader's last poll
+        return self._header()[4] or None
+
+    def publish(self, body):
+        version = self.published
+        if HEADER.size + len(body) > len(self._map):
+            self._remap(HEADER.size + 2 * len(body))
+        struct.pack_into("<Q", self._map, VERSION_OFFSET, version + 1)
+        self._map[HEADER.size:HEADER.size + len(body)] = body
+        HEADER.pack_into(self._map, 0, MAGIC, version + 1, len(body), time.time(), self._poller.status or 0)
+        struct.pack_into("<Q", self._map, VERSION_OFFSET, version + 2)
+        self.version = version + 2
+        metrics.count("feed_shared_total", role="publish")
+
+    def _read(self):
+        for _ in range(READ_ATTEMPTS):
+            magic, version, length, _, _ = self._header()
+            if magic != MAGIC or version == self.version:
+                return None
+            if version & 1:
+                time.sleep(0.001)
+                continue
+            if HEADER.size + length > len(self._map):
+                self._remap(HEADER.size + length)
+            body = self._map[HEADER.size:HEADER.size + length]
+            if self.published == version:
+                self.version = version
+                metrics.count("feed_shared_total", role="read")
+                return body
+        self._logger.info(f"Gave up reading {self.path}, the leader is stuck writing")
+        return None
+
+    def fetch(self):
+        """The body published since the last fetch, polling the feed first if leading
+
+        Returns None when nothing new was published, like an unchanged FeedPoller.
+        """
+        if not self._lead():
+            return self._read()
+        body = self._poller.fetch()
+        self._updateStatus()
+        if body is not None:
+            self.publish(body)
+        return body
+
+    def stream(self):
+        if not self._lead():
+            body = self._read()
+            if body:
+                yield body
+            return
+        chunks = []
+        for chunk in self._poller.stream():
+            chunks.append(chunk)
+            yield chunk
+        self._updateStatus()
+        if chunks and self._poller.status == 200:
+            self.publish(b"".join(chunks))
+
+    def _updateStatus(self):
+        struct.pack_into("<i", self._map, STATUS_OFFSET, self._poller.status or 0)
+
+    def wait(self, timeout):
+        """Sleep until a new body is published, at most ``timeout`` seconds
+
+        Leaders just sleep, it is their own poll that publishes.
+        """
+        deadline = time.monotonic() + timeout
+        if self.leading:
+            time.sleep(timeout)
+            return False
+        while self.published == self.version:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return False
+            time.sleep(min(WAKE_INTERVAL, left))
+        return True
+
+    def close(self):
+        self._poller.close()
+        self._map.close()
+        os.close(self._fd)
+        # releases the lead, if held
+        os.close(self._lock)
+        self.leading = False
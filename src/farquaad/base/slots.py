@@ -0,0 +1,98 @@
+import datetime
+import re
+
+# dates, and times per date, tried before giving up on a manufacturer
+FALLBACKS = 3
+DATE_FORMATS = ("%b %d", "%B %d", "%b %d, %Y", "%B %d, %Y", "%A, %B %d, %Y", "%a, %b %d, %Y", "%m/%d/%Y", "%m/%d", "%Y-%m-%d")
+TIME_FORMATS = ("%I:%M %p", "%I:%M%p", "%I %p", "%H:%M")
+
+
+def parseDate(label, today=None):
+    """The date of a date option label, None when it can't be read
+
+    Labels without a year are taken to be within the next year from ``today``.
+    """
+    today = today or datetime.date.today()
+    text = " ".join(label.split())
+    for fmt in DATE_FORMATS:
+        dated = "%Y" in fmt
+        try:
+            parsed = datetime.datetime.strptime(text if dated else f"{text} {today.year}", fmt if dated else f"{fmt} %Y")
+        except ValueError:
+            continue
+        date = parsed.date()
+        if not dated and date < today - datetime.timedelta(days=180):
+            date = date.replace(year=today.year + 1)
+        return date
+    return None
+
+
+def parseTime(label):
+    """The start time of a time option label ("9:15 AM", "9:15 AM - 9:30 AM", "13:00"), None when it can't be read
+    """
+    text = re.split(r"\s*[-–]\s*", label.strip())[0].upper()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+class SlotPreferences(object):
+    """What appointment a patient wants, used to rank the date and time options
+
+    Built from the patient data: ``manufacturer`` (one name, or a list in order
+    of preference), ``notbefore``/``notafter`` dates (MM/DD/YYYY) and a
+    ``timewindow`` of two 24 hour "HH:MM" times. Options outside the windows
+    are never picked; the rest are ranked earliest first and at most
+    ``limit`` of them are tried. Options whose label can't be read are tried
+    after the others, in page order.
+    """
+
+    def __init__(self, manufacturers, notBefore=None, notAfter=None, window=None, limit=FALLBACKS, today=None):
+        self.manufacturers = manufacturers
+        self.notBefore = notBefore
+        self.notAfter = notAfter
+        self.window = window
+        self.limit = limit
+        self.today = today
+
+    @classmethod
+    def fromPatient(cls, patientData, limit=FALLBACKS, today=None):
+        manufacturers = patientData.get("manufacturer") or ["Any"]
+        if isinstance(manufacturers, str):
+            manufacturers = [manufacturers]
+
+        def date(key):
+            value = patientData.get(key)
+            return datetime.datetime.strptime(value, "%m/%d/%Y").date() if value else None
+
+        window = patientData.get("timewindow")
+        if window:
+            window = tuple(datetime.datetime.strptime(t, "%H:%M").time() for t in window)
+        return cls(list(manufacturers), date("notbefore"), date("notafter"), window or None, limit, today)
+
+    def _rank(self, options, parse, accept):
+        known, unknown = [], []
+        for index, option in enumerate(options):
+            value = parse(option["label"])
+            if value is None:
+                unknown.append(option)
+            elif accept(value):
+                known.append((value, index, option))
+        return ([option for _, _, option in sorted(known, key=lambda entry: entry[:2])] + unknown)[:self.limit]
+
+    def rankDates(self, options):
+        """The date options worth trying, best first
+        """
+        def accept(date):
+            return (self.notBefore is None or date >= self.notBefore) and (self.notAfter is None or date <= self.notAfter)
+        return self._rank(options, lambda label: parseDate(label, self.today), accept)
+
+    def rankTimes(self, options):
+        """The time options worth trying, best first
+        """
+        def accept(time):
+            return self.window is None or self.window[0] <= time <= self.window[1]
+        return self._rank(options, parseTime, accept)
@@ -0,0 +1,73 @@
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+OPENED = "opened"
+CLOSED = "closed"
+CHANGED = "changed"
+
+# a single store level difference between two consecutive feed polls
+Change = namedtuple("Change", ["kind", "store", "slots", "location"])
+
+
+class Snapshot(object):
+    """Last known availability of the feed keyed by store
+
+    Each update is compared against the previous poll so only the stores that
+    opened, closed or changed their slot count need to be filtered again.
+    """
+
+    def __init__(self):
+        self._stores = {}
+
+    def update(self, locations):
+        current = {}
+        changes = []
+        for loc in locations:
+            store = loc.name
+            current[store] = loc
+            previous = self._stores.get(store)
+            if previous is None:
+                changes.append(Change(OPENED, store, loc.openTimeslots, loc))
+            elif previous.openTimeslots != loc.openTimeslots:
+                changes.append(Change(CHANGED, store, loc.openTimeslots, loc))
+        for store in self._stores.keys() - current.keys():
+            changes.append(Change(CLOSED, store, 0, self._stores[store]))
+        self._stores = current
+        return changes
+
+    def __len__(self):
+        return len(self._stores)
+
+    def __contains__(self, store):
+        return store in self._stores
+
+
+class Ranking(object):
+    """Filtered locations kept ordered by distance as they are added and removed
+    """
+
+    def __init__(self):
+        self._order = []
+        self._entries = {}
+
+    def put(self, store, loc):
+        self.remove(store)
+        self._entries[store] = loc
+        insort(self._order, (loc.distance, store))
+
+    def remove(self, store):
+        loc = self._entries.pop(store, None)
+        if loc is None:
+            return None
+        index = bisect_left(self._order, (loc.distance, store))
+        del self._order[index]
+        return loc
+
+    def list(self):
+        return [self._entries[store] for _, store in self._order]
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, store):
+        return store in self._entries
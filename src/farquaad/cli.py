@@ -2,15 +2,21 @@ import argparse
 import json
 import logging
 import sys
+import threading
 
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from pyvirtualdisplay import Display
-
-from .distributors.heb import HEB
+# only light modules are imported up front so --help, --version and argument
+# errors are instant; Selenium, the X display, geopy and numpy are imported
+# by main() once they are needed
 from .base import Restrictions
-
-from farquaad import __version__
+from .base import browser
+from .base import evidence
+from .base.scheduler import AdaptiveScheduler
+from .base.matcher import Patient, PatientIndex
+from .base.geocache import GeoCache, defaultCacheDir
+from .base.journey import UnconfirmedBooking
+from .base.metrics import Exporter, metrics
+from .base.prefetch import Prefetcher
+from .base.recorder import FeedRecorder
 
 __author__ = "Jason Switzer"
 __copyright__ = "Jason Switzer"
@@ -24,20 +30,52 @@ _logger = logging.getLogger(__name__)
 # `from farquaad.cli import heb`,
 # when using this Python module as a library.
 
-def heb(driver=None, logger=None):
-    return HEB(driver, logger)
+def heb(driver=None, logger=None, cache=None, pool=None, launch=None):
+    from .distributors.heb import HEB
+    return HEB(driver, logger, cache=cache, pool=pool, launch=launch)
+
+def patients(lines, defaults, cache=None):
+    """Build a PatientIndex from JSON lines of patient data
+
+    Besides the patient form fields, each line may carry its own ``home``,
+    ``distance``, ``cities`` and ``zipcodes``; missing ones fall back to the
+    ``defaults`` (a dict of the same keys).
+    """
+    from .base import Filter
+    index = None
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        settings = {key: data.get(key, defaults.get(key)) for key in ("home", "distance", "cities", "zipcodes")}
+        restricted = Restrictions(cities=settings["cities"], zipcodes=settings["zipcodes"], distance=settings["distance"])
+        refine = Filter(settings["home"], restricted, cache=cache)
+        if index is None:
+            index = PatientIndex(refine.coordinates)
+        index.add(Patient(number, data, refine))
+    return index
 
 # ---- CLI ----
 # The functions defined in this section are wrappers around the main Python
 # API allowing them to be called directly from the terminal as a CLI
 # executable/script.
 
+class VersionAction(argparse.Action):
+    """--version, looking the installed version up only when it is asked for"""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help="show program's version number and exit"):
+        super().__init__(option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from farquaad import __version__
+        print(f"farquaad {__version__}")
+        parser.exit()
+
 def parse_args(args):
     parser = argparse.ArgumentParser(description="Automated Vaccine scheduler")
     parser.add_argument(
         "--version",
-        action="version",
-        version="farquaad {ver}".format(ver=__version__),
+        action=VersionAction,
     )
     parser.add_argument(
         "-v",
@@ -103,7 +141,145 @@ def parse_args(args):
         help="Patient automation data file - see form.json for a sample",
         type=argparse.FileType('r'), 
     )
-    return parser.parse_args(args)
+    parser.add_argument(
+        "-s",
+        "--stream",
+        dest="stream",
+        help="Book each matching location as soon as it is read from the feed instead of waiting for the full list",
+        action="store_true"
+    )
+    parser.add_argument(
+        "-a",
+        "--async",
+        dest="concurrent",
+        help="Poll every distributor concurrently and book from one merged ranking",
+        action="store_true"
+    )
+    parser.add_argument(
+        "-B",
+        "--patients",
+        dest="patients",
+        help="Batch mode: JSON lines of patient data, each optionally with its own home, distance, cities and zipcodes",
+        type=argparse.FileType('r'),
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        dest="incremental",
+        help="Only re-filter the stores whose availability changed since the last check",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cachedir",
+        help="Directory of the geocode and distance cache shared by all farquaad processes",
+        default=defaultCacheDir(),
+    )
+    parser.add_argument(
+        "--pool-size",
+        dest="poolsize",
+        help="Keep this many warm browser sessions ready for booking instead of a single one launched at startup",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        help="Prepared Firefox profile directory each browser session starts from",
+    )
+    parser.add_argument(
+        "--persistent-profile",
+        dest="persistent",
+        help="Run the browser straight out of --profile so cookies and history carry over between runs",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--browser-mode",
+        dest="browsermode",
+        help="Browser configuration: standard, or lean (no images, fonts, media or trackers)",
+        choices=browser.MODES,
+        default=browser.STANDARD,
+    )
+    parser.add_argument(
+        "--headless",
+        dest="headless",
+        help="Use Firefox's own headless mode instead of a virtual X display",
+        action="store_true"
+    )
+    parser.add_argument(
+        "-k",
+        "--parallel",
+        dest="parallel",
+        help="Race booking attempts against this many of the best sites at once (one browser each)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--adaptive",
+        dest="adaptive",
+        help="Adapt the time delay: poll faster while availability is changing, back off while it is not or on errors",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--max-rate",
+        dest="maxrate",
+        help="Maximum availability checks per second in --adaptive mode",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "--record",
+        dest="record",
+        help="Append every changed availability snapshot to this file, for replaying with benchmarks/bench_replay.py",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metricsfile",
+        help="Periodically write per-phase latency histograms to this file in the Prometheus text format",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        dest="metricsport",
+        help="Serve per-phase latency histograms for Prometheus on this port",
+        type=int,
+    )
+    parser.add_argument(
+        "--warm",
+        dest="warm",
+        help="Start the browser in the background as soon as a poll finds open slots, rather than when booking starts",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--screenshots",
+        dest="screenshots",
+        help="Directory booking attempt screenshots are written to",
+        default="screenshots",
+    )
+    parser.add_argument(
+        "--screenshot-mode",
+        dest="screenshotmode",
+        help="Screenshot every booking step (always), only the page after submitting (submit), only where a failed attempt stopped (failure), or nothing (off)",
+        choices=evidence.MODES,
+        default=evidence.ALWAYS,
+    )
+    parser.add_argument(
+        "--prefetch",
+        dest="prefetch",
+        help="Preload the booking pages of the next N best stores in background browser tabs while booking",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--share-feed",
+        dest="sharefeed",
+        help="Share the feed with the other instances on this host using the same file: one of them polls, the rest read its snapshot",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.distance is not None and not parsed.home and not parsed.patients:
+        parser.error("--distance requires --home")
+    if not (parsed.sanity or parsed.patients or parsed.patientdata):
+        parser.error("-P/--patient-data is required, unless --patients or --sanity is given")
+    return parsed
 
 def setup_logging(loglevel):
     """Setup basic logging
@@ -119,43 +295,124 @@ def setup_logging(loglevel):
 def main(args):
     args = parse_args(args)
     setup_logging(args.loglevel)
-    _logger.debug("Initializing the default web driver")
-    
-    # let's create the driver here so we can reuse it
-    display = Display(visible=0, size=(800, 600))
-    display.start()
-    options = Options()
-    options.headless = False
-    driver = webdriver.Firefox(options=options)
+    # read the patient data before starting anything, so a bad file fails fast
+    patientData = json.load(args.patientdata) if args.patientdata else None
+
+    exporter = None
+    if args.metricsfile or args.metricsport is not None:
+        exporter = Exporter(metrics, path=args.metricsfile, port=args.metricsport)
+
+    pool = None
+    if args.parallel > 1:
+        # every racing attempt needs its own browser
+        args.poolsize = max(args.poolsize, args.parallel)
+    if args.persistent and args.poolsize > 0:
+        # Firefox locks a profile to a single running instance
+        _logger.warning("--persistent-profile needs a single browser, pooled sessions start from copies of the profile")
+        args.persistent = False
+    if args.prefetch and args.poolsize > 0:
+        _logger.warning("--prefetch needs a single browser, pooled sessions load their pages on demand")
+        args.prefetch = 0
+
+    # the browser, and the virtual display it needs, are only started once a
+    # booking (or --sanity) asks for one
+    display = None
+    displayLock = threading.Lock()
+
+    def firefox():
+        nonlocal display
+        with displayLock:
+            if display is None and not args.headless:
+                from pyvirtualdisplay import Display
+                display = Display(visible=0, size=(800, 600))
+                display.start()
+        _logger.debug("Initializing the web driver")
+        return browser.firefox(args.browsermode, args.profile, args.headless, args.persistent, tabs=args.prefetch > 0)
+
+    def shutdown():
+        henryebutts.finalize()
+        if display:
+            display.stop()
+        if exporter:
+            exporter.close()
+        _logger.info("Latency by phase:")
+        for line in metrics.summary():
+            _logger.info(f"  {line}")
+
+    if args.poolsize > 0:
+        from .base.drivers import DriverPool
+        pool = DriverPool(firefox, _logger, size=args.poolsize, lazy=True)
 
     # find a store, grab a slot, cleanup
-    henryebutts = heb(driver=driver, logger=_logger)
-
-    if args.sanity:
-        goodToGo = henryebutts.sanity(args.timedelay)
-        if goodToGo:
-            _logger.info("Sanity test complete; environment is good")
-        else:
-            _logger.info("Sanity test complete; environment is not good - check requirements and distributor's website")
-        driver.quit()
-        display.stop()
-        sys.exit(goodToGo ? 1 : 0)
-        
-    patientData = json.load(args.patientdata)
-    restricted = Restrictions(cities=args.cities, zipcodes=args.zipcodes, distance=args.distance)
-    appt = None
-
-    while not appt:
-        possibleSites = henryebutts.monitor(args.home, restricted, args.timedelay)
-        print(possibleSites)
-        appt = henryebutts.schedule(possibleSites, patientData)
-        if appt:
-            _logger.info(f"Appointment scheduled at {appt['name']}")
-            break
-        #if we didn't break out, all of the slots found booked too quick, start over
-    henryebutts.finalize()
-    display.stop()
-    _logger.info("Auto-registration complete, heck the provided email for the appointment")
+    cache = GeoCache(args.cachedir)
+    henryebutts = heb(logger=_logger, cache=cache, pool=pool, launch=None if pool else firefox)
+    henryebutts.warmup = args.warm
+    if args.sharefeed:
+        henryebutts.share(args.sharefeed)
+    if args.prefetch:
+        henryebutts.prefetcher = Prefetcher(_logger, size=args.prefetch)
+    if args.screenshotmode != evidence.OFF:
+        henryebutts.evidence = evidence.EvidenceWriter(args.screenshots, _logger, mode=args.screenshotmode)
+    if args.record:
+        henryebutts.recorder = FeedRecorder(args.record)
+    if args.adaptive:
+        henryebutts.scheduler = AdaptiveScheduler(args.timedelay, maxRate=args.maxrate)
+
+    # Ctrl-C is how monitoring usually ends, the recording, browsers and
+    # metrics are closed either way
+    try:
+        if args.sanity:
+            goodToGo = henryebutts.sanity(args.timedelay)
+            if goodToGo:
+                _logger.info("Sanity test complete; environment is good")
+            else:
+                _logger.info("Sanity test complete; environment is not good - check requirements and distributor's website")
+            sys.exit(0 if goodToGo else 1)
+
+        if args.patients:
+            defaults = {"home": args.home, "distance": args.distance, "cities": args.cities, "zipcodes": args.zipcodes}
+            waiting = patients(args.patients, defaults, cache=cache)
+            while waiting:
+                for key, possibleSites in henryebutts.monitorBatch(waiting, args.timedelay).items():
+                    patient = waiting.patient(key)
+                    appt = henryebutts.schedule(possibleSites, patient.data)
+                    if appt:
+                        _logger.info(f"Appointment scheduled for {patient.name} at {appt.name}")
+                        waiting.remove(key)
+            _logger.info("Batch auto-registration complete, check the provided emails for the appointments")
+            return
+
+        restricted = Restrictions(cities=args.cities, zipcodes=args.zipcodes, distance=args.distance)
+        appt = None
+
+        if args.concurrent:
+            from .distributors.engine import MonitorEngine
+            engine = MonitorEngine(_logger)
+            engine.add(henryebutts, args.timedelay)
+            distributor, appt = engine.book(args.home, restricted, patientData)
+            _logger.info(f"Appointment scheduled at {distributor._name} {appt.name}")
+        elif args.stream:
+            appt = henryebutts.scheduleStream(args.home, restricted, args.timedelay, patientData)
+            _logger.info(f"Appointment scheduled at {appt.name}")
+
+        while not appt:
+            possibleSites = henryebutts.monitor(args.home, restricted, args.timedelay, incremental=args.incremental)
+            print(possibleSites)
+            if args.parallel > 1:
+                appt = henryebutts.scheduleParallel(possibleSites, patientData, args.parallel)
+            else:
+                appt = henryebutts.schedule(possibleSites, patientData)
+            if appt:
+                _logger.info(f"Appointment scheduled at {appt.name}")
+                break
+            #if we didn't break out, all of the slots found booked too quick, start over
+        _logger.info("Auto-registration complete, heck the provided email for the appointment")
+    except UnconfirmedBooking as e:
+        # booking anywhere else could book the patient twice, a person has to look
+        _logger.error(f"{e}; stopped, check the provided email before running again")
+        sys.exit(1)
+    finally:
+        shutdown()
 
 def run():
     """Calls :func:`main` passing the CLI arguments extracted from :obj:`sys.argv`
@@ -1,50 +1,390 @@
+import asyncio
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from operator import attrgetter
 from time import sleep
 from ..base import Filter
+from ..base.journey import UnconfirmedBooking
+from ..base.metrics import metrics
+from ..base.snapshot import CLOSED, OPENED, Ranking, Snapshot
+
+class BookingRace(object):
+    """Coordinates parallel booking attempts made on behalf of one patient
+
+    An attempt claims the race right before its final submit; only the first
+    claim succeeds, and every other attempt sees the race as cancelled and
+    abandons its journey at the next step.
+    """
+
+    def __init__(self):
+        self._claimed = threading.Event()
+        self._lock = threading.Lock()
+        self.winner = None
+
+    @property
+    def cancelled(self):
+        return self._claimed.is_set()
+
+    def claim(self, openSlot):
+        with self._lock:
+            if self._claimed.is_set():
+                return False
+            self.winner = openSlot
+            self._claimed.set()
+            return True
 
 class Distributor:
-    def __init__(self, name, driver, logger):
+    def __init__(self, name, driver, logger, cache=None, pool=None, launch=None):
         self._name = name
         self._driver = driver
+        self._pool = pool
+        # builds the driver on first use when none was given, so monitoring
+        # never waits on (or pays for) a browser
+        self._launch = launch
+        self._launching = None
+        self._launchLock = threading.Lock()
+        # start the browser in the background as soon as a poll finds slots
+        self.warmup = False
         self._logger = logger
+        self._feed = None
+        # SharedFeed the feed is polled through, None polls it directly
+        self._shared = None
+        self._cache = cache
+        # PollScheduler pacing the polls, None sleeps the delay given to monitor()
+        self.scheduler = None
+        # FeedRecorder persisting every changed snapshot, None records nothing
+        self.recorder = None
+        # EvidenceWriter keeping screenshots of booking attempts, None takes none
+        self.evidence = None
+        # Prefetcher preloading the booking pages of the next best stores, None loads them on demand
+        self.prefetcher = None
+        self._refine = None
+        self._snapshot = Snapshot()
+        self._ranking = Ranking()
+        self._listeners = []
+        # (timestamp, Change) for every store level difference seen while monitoring
+        self.changelog = deque(maxlen=1000)
+        # perf_counter() of the poll that produced the sites being booked
+        self.detected = None
         self._logger.info(f"Initialized distributor registration journey: {self._name}")
 
     def checkAvailability(self, restrictions):
         self._logger.info(f"Checking distributor registration availability: {self._name}")
 
-    def monitor(self, home, restrictions, delay):
+    def share(self, path):
+        """Poll the feed through the snapshot shared by every instance using ``path``
+        """
+        if self._feed is None:
+            raise ValueError(f"{self._name} has no feed to share")
+        # needs fcntl, which only POSIX platforms have
+        from ..base.sharedfeed import SharedFeed
+        self._shared = self._feed = SharedFeed(path, self._feed, self._logger)
+
+    def pace(self, delay):
+        """Sleep until the next poll is due
+        """
+        if self._shared is not None and not self._shared.leading:
+            # the leading instance does the polling, wake up as soon as it publishes
+            self._shared.wait(delay)
+        elif self.scheduler is None:
+            sleep(delay)
+        else:
+            self.scheduler.wait()
+
+    def observed(self, availability):
+        """Report the outcome of a poll to the scheduler and the recorder
+
+        ``availability`` is the poll result, None when nothing changed, or a bool
+        when only whether something changed is known.
+        """
+        if self.recorder is not None and isinstance(availability, list):
+            self.recorder.record(availability)
+        if self.warmup and availability:
+            self.warm()
+        if self.scheduler is None:
+            return
+        status = 200 if self._feed is None else self._feed.status
+        if isinstance(availability, bool):
+            self.scheduler.observe(availability, status)
+            return
+        slots = None if availability is None else sum(loc.openTimeslots for loc in availability)
+        self.scheduler.observe(availability is not None, status, slots)
+
+    def poll(self, delay):
+        """Wait for the next poll to be due, then check availability once
+        """
+        self.pace(delay)
+        availability = self.checkAvailability()
+        if availability is not None:
+            self.detected = time.perf_counter()
+        self.observed(availability)
+        return availability
+
+    def booked(self, appt):
+        """Record the latency from detecting ``appt`` to having booked it
+        """
+        metrics.count("bookings_total")
+        if self.detected is not None:
+            metrics.observe("phase_seconds", time.perf_counter() - self.detected, phase="detect_to_booked")
+        return appt
+
+    async def fetchAvailability(self, executor=None):
+        """Asynchronous checkAvailability, by default run on a thread of ``executor``
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.checkAvailability)
+
+    def streamAvailability(self):
+        """Open locations, yielded as soon as each one has been parsed from the feed
+        """
+        yield from self.checkAvailability() or []
+
+    def _filter(self, home, restrictions):
+        if self._refine is None or (self._refine.home, self._refine.restrictions) != (home, restrictions):
+            self._refine = Filter(home, restrictions, cache=self._cache)
+        return self._refine
+
+    def candidates(self, home, restrictions):
+        """Stream the locations satisfying the restrictions one at a time, in feed order
+        """
+        refine = self._filter(home, restrictions)
+        for loc in self.streamAvailability():
+            distance = refine.accept(loc)
+            if distance is not None:
+                yield loc.located(distance)
+
+    def subscribe(self, listener):
+        """Register a callable invoked with every Change found by incremental monitoring
+        """
+        self._listeners.append(listener)
+
+    def monitor(self, home, restrictions, delay, incremental=False):
         self._logger.info(f"Monitoring distributor registration availability: {self._name}")
+        if incremental:
+            return self.monitorChanges(home, restrictions, delay)
         availability = None
-        refine = Filter(home, restrictions)
+        refine = Filter(home, restrictions, cache=self._cache)
         while not availability:
-            sleep(delay)
-            availability = self.checkAvailability()
+            availability = self.poll(delay)
+            if availability is None:
+                # nothing changed upstream since the last poll
+                continue
             availability = refine.apply(availability)
-            availability = sorted(availability, key=lambda slot: slot["distance"])
+            with metrics.timed("sort"):
+                availability = sorted(availability, key=attrgetter("distance"))
+            self.speculate(availability)
         return availability
 
+    def monitorChanges(self, home, restrictions, delay):
+        """Monitor by diffing each poll against the previous one
+
+        Only stores that opened or changed their slot count are filtered, and the
+        ranked result is maintained in place, so the cost of a poll follows the
+        number of changes rather than the size of the feed.
+        """
+        refine = self._filter(home, restrictions)
+        while True:
+            availability = self.poll(delay)
+            if availability is None:
+                continue
+            changes = self._snapshot.update(availability)
+            for change in changes:
+                self.changelog.append((time.time(), change))
+                if change.kind == CLOSED:
+                    if self._ranking.remove(change.store) is not None:
+                        self._logger.info(f"Slots closed at {change.store}")
+                    continue
+                accepted = refine.apply([change.location])
+                if not accepted:
+                    self._ranking.remove(change.store)
+                    continue
+                self._ranking.put(change.store, accepted[0])
+                if change.kind == OPENED:
+                    self._logger.info(f"Slot opened at {change.store} ({change.slots} slots)")
+                else:
+                    self._logger.info(f"Slot count changed at {change.store} ({change.slots} slots)")
+                for listener in self._listeners:
+                    listener(change)
+            if changes:
+                self.speculate(self._ranking.list())
+            if changes and len(self._ranking):
+                return self._ranking.list()
+
+    def monitorBatch(self, patients, delay):
+        """Monitor on behalf of every patient in a PatientIndex with one poll per tick
+
+        Returns a dict of patient key -> distance ranked sites for the patients
+        that gained matches on the tick that ended the wait.
+        """
+        self._logger.info(f"Monitoring distributor registration availability for {len(patients)} patients: {self._name}")
+        while True:
+            availability = self.poll(delay)
+            if availability is None:
+                continue
+            changes = self._snapshot.update(availability)
+            now = time.time()
+            self.changelog.extend((now, change) for change in changes)
+            matched = patients.update(changes)
+            for key in matched:
+                self._logger.info(f"Slots matched for {patients.patient(key).name}")
+            if matched:
+                return {key: patients.ranking(key) for key in matched}
+
     def sanity(self, delay):
         self._logger.info(f"Sanity checking distributor registration journey: {self._name}")
         while True:
-            sleep(delay)
-            availability = self.checkAvailability()
+            availability = self.poll(delay)
+            if availability is None:
+                continue
             for appt in availability:
                 if self.verify(appt):
                     return True
         return False
     
-    def process(self, openSlot, patientData):
+    def speculate(self, ranked):
+        """Have the prefetcher preload the booking pages of the best of ``ranked``
+
+        Only the unpooled browser is used, and only once it is up: speculation
+        never launches a browser itself.
+        """
+        if self.prefetcher is None or self._pool is not None or self._driver is None:
+            return
+        try:
+            self.prefetcher.update(self._driver, ranked)
+        except Exception as e:
+            self._logger.info(f"Prefetching failed: {e}")
+
+    def warm(self):
+        """Start the browser (or the pool's browsers) in the background, if not done yet
+        """
+        if self._pool is not None:
+            self._pool.start()
+            return
+        if self._driver is not None or self._launch is None or self._launching is not None:
+            return
+        self._logger.info(f"Warming up a browser: {self._name}")
+        self._launching = threading.Thread(target=self.driver, name="farquaad-warmup", daemon=True)
+        self._launching.start()
+
+    def driver(self):
+        """The browser of unpooled booking attempts, launched now if it isn't yet
+        """
+        with self._launchLock:
+            if self._driver is None and self._launch is not None:
+                self._driver = self._launch()
+            return self._driver
+
+    @contextmanager
+    def session(self):
+        """Borrow a warm browser from the pool, if there is one, for one booking attempt
+        """
+        if self._pool is None:
+            yield self.driver()
+            return
+        driver = self._pool.acquire()
+        try:
+            yield driver
+        finally:
+            self._pool.release(driver)
+
+    def process(self, openSlot, patientData, race=None):
         self._logger.info(f"Processing distributor registration journey: {self._name}")
 
     def schedule(self, availability, patientdata):
         self._logger.info(f"Searching for and scheduling distributor registration journey: {self._name}")
         booked = False
-        for appt in availability:
+        for index, appt in enumerate(availability):
+            # the sites after this one load in the background while it is tried
+            self.speculate(availability[index:])
             booked = self.process(appt, patientdata)
             if booked:
-                return appt
+                return self.booked(appt)
+
+    def scheduleParallel(self, availability, patientdata, concurrency):
+        """Race booking attempts against the ``concurrency`` best sites at once
+
+        Each attempt runs on its own browser from the pool; as one finishes
+        without booking, the next best site takes its place. At most one attempt
+        is allowed to submit the patient form. An attempt that submitted
+        without a confirmation ends the race like a booking would, and is raised.
+        """
+        self._logger.info(f"Racing {concurrency} registration journeys: {self._name}")
+        race = BookingRace()
+        pending = iter(availability)
+        booked = None
+        unconfirmed = None
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="farquaad-race") as executor:
+            running = {executor.submit(self.process, appt, patientdata, race): appt for appt in islice(pending, concurrency)}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    appt = running.pop(future)
+                    try:
+                        if future.result():
+                            booked = appt
+                    except UnconfirmedBooking as e:
+                        unconfirmed = e
+                    except Exception as e:
+                        self._logger.info(f"Booking attempt at {appt.name} failed: {e}")
+                if race.cancelled:
+                    # let the losing attempts notice the cancellation and return their browsers
+                    continue
+                for appt in islice(pending, len(done)):
+                    running[executor.submit(self.process, appt, patientdata, race)] = appt
+        if unconfirmed is not None:
+            raise unconfirmed
+        return booked and self.booked(booked)
+
+    def scheduleStream(self, home, restrictions, delay, patientdata):
+        """Poll and book without waiting for the whole feed
+
+        Each location is handed to process() as soon as it is parsed and passes
+        the restrictions, so the rest of the feed is only read if the booking
+        attempt fails.
+        """
+        self._logger.info(f"Streaming and scheduling distributor registration journey: {self._name}")
+        while True:
+            self.pace(delay)
+            for appt in self.candidates(home, restrictions):
+                self.detected = time.perf_counter()
+                self._logger.info(f"Candidate found at {appt.name} ({appt.distance:.1f} miles)")
+                if self.process(appt, patientdata):
+                    return self.booked(appt)
+            # the slot count isn't known without keeping the whole feed around
+            self.observed(self._feed is None or self._feed.status == 200)
 
     def finalize(self):
-        self._driver.quit()
+        if self._feed is not None:
+            self._feed.close()
+        if self._cache is not None:
+            self._cache.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.evidence is not None:
+            self.evidence.close()
+        if self.scheduler is not None:
+            stats = self.scheduler.stats()
+            self._logger.info(
+                f"Polled {stats['polls']} times, {stats['hitRate']:.0%} with changes, {stats['errors']} errors, "
+                f"intervals {stats['minInterval']:.2f}-{stats['maxInterval']:.2f}s (mean {stats['meanInterval']:.2f}s)"
+            )
+        if self.prefetcher is not None:
+            stats = self.prefetcher.stats()
+            self._logger.info(
+                f"Prefetched booking pages: {stats['hits']} hits, {stats['misses']} misses ({stats['hitRate']:.0%}), "
+                f"about {stats['savedSeconds']:.1f}s of page loads saved"
+            )
+        if self._pool is not None:
+            self._pool.close()
+        else:
+            if self._launching is not None:
+                self._launching.join()
+            if self._driver is not None:
+                self._driver.quit()
         self._logger.info(f"Finalizing registration distributor: {self._name}")
 
@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+
+from ..base.metrics import metrics
+
+# seconds before polling a distributor again after a failed poll, doubled on each further failure
+BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+class MonitorEngine(object):
+    """Polls many distributors concurrently and books from one merged ranking
+
+    Every distributor polls on its own schedule through its async
+    fetchAvailability(), and its latest filtered availability replaces its
+    previous entry in the merged ranking. Booking runs the blocking Selenium
+    journey on a single worker thread, so polling never waits on the browser.
+    A poll that raises is logged and retried after a growing backoff,
+    starting at ``backoff`` seconds, so one broken feed neither stops its
+    distributor's polling nor the others'.
+    """
+
+    def __init__(self, logger, backoff=BACKOFF, maxBackoff=MAX_BACKOFF):
+        self._logger = logger
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self._distributors = []
+        self._latest = {}
+        self._changed = None
+        self._polling = None
+        # distributor name -> seconds taken by each poll, to compare against a single distributor
+        self.latency = {}
+
+    def add(self, distributor, delay):
+        self._distributors.append((distributor, delay))
+        self.latency[distributor._name] = []
+
+    def _interval(self, distributor, delay, failures):
+        interval = delay if distributor.scheduler is None else distributor.scheduler.next()
+        if failures:
+            interval = max(interval, min(self.backoff * 2 ** (failures - 1), self.maxBackoff))
+        return interval
+
+    async def _poll(self, distributor, delay, home, restrictions):
+        loop = asyncio.get_running_loop()
+        refine = None
+        failures = 0
+        while True:
+            await asyncio.sleep(self._interval(distributor, delay, failures))
+            try:
+                if refine is None:
+                    refine = await loop.run_in_executor(self._polling, distributor._filter, home, restrictions)
+                started = time.monotonic()
+                availability = await distributor.fetchAvailability(self._polling)
+                self.latency[distributor._name].append(time.monotonic() - started)
+                distributor.observed(availability)
+                if availability is None:
+                    failures = 0
+                    continue
+                distributor.detected = time.perf_counter()
+                availability = await loop.run_in_executor(self._polling, refine.apply, availability)
+            except Exception as e:
+                failures += 1
+                metrics.count("poll_errors_total", distributor=distributor._name)
+                self._logger.warning(f"Polling {distributor._name} failed ({failures} in a row), retrying: {e}")
+                if distributor.scheduler is not None:
+                    distributor.scheduler.observe(False, None)
+                continue
+            failures = 0
+            self._latest[distributor] = sorted(availability, key=attrgetter("distance"))
+            if availability:
+                self._changed.set()
+
+    def ranked(self):
+        """Current (distance, distributor, site) candidates of all distributors, nearest first
+        """
+        lists = [
+            [(appt.distance, order, distributor, appt) for appt in availability]
+            for order, (distributor, availability) in enumerate(self._latest.items())
+        ]
+        return [(distance, distributor, appt) for distance, _, distributor, appt in heapq.merge(*lists)]
+
+    async def run(self, home, restrictions, patientData):
+        """Monitor every distributor until one of them books, returning (distributor, site)
+        """
+        loop = asyncio.get_running_loop()
+        # a thread per distributor, so a slow feed never holds up the others
+        self._polling = ThreadPoolExecutor(max_workers=len(self._distributors), thread_name_prefix="farquaad-poll")
+        self._changed = asyncio.Event()
+        pollers = [
+            asyncio.ensure_future(self._poll(distributor, delay, home, restrictions))
+            for distributor, delay in self._distributors
+        ]
+        booking = ThreadPoolExecutor(max_workers=1, thread_name_prefix="farquaad-booking")
+        try:
+            while True:
+                await self._changed.wait()
+                self._changed.clear()
+                for distance, distributor, appt in self.ranked():
+                    self._logger.info(f"Trying {distributor._name} {appt.name} ({distance:.1f} miles)")
+                    if await loop.run_in_executor(booking, distributor.process, appt, patientData):
+                        return distributor, distributor.booked(appt)
+                    # don't retry it until the distributor reports it again
+                    latest = self._latest.get(distributor, [])
+                    if appt in latest:
+                        latest.remove(appt)
+                    # newer availability arrived while booking, rank again
+                    if self._changed.is_set():
+                        break
+        finally:
+            for poller in pollers:
+                poller.cancel()
+            await asyncio.gather(*pollers, return_exceptions=True)
+            # neither in-flight polls nor an abandoned booking should delay the result
+            self._polling.shutdown(wait=False)
+            booking.shutdown(wait=False)
+
+    def book(self, home, restrictions, patientData):
+        return asyncio.run(self.run(home, restrictions, patientData))
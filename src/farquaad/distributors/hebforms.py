@@ -0,0 +1,252 @@
+import datetime
+
+from selenium.common.exceptions import TimeoutException
+
+from ..base.page import Page
+from ..base.slots import SlotPreferences
+
+class AppointmentForm(Page):
+
+    def __init__(self, driver, logger, today=datetime.date.today):
+        super().__init__(driver, logger)
+        # the date the year-less date options are read relative to
+        self._today = today
+        # (manufacturer, date, time) labels selected by this attempt, which were
+        # taken by someone else if the attempt is back here, so never picked again
+        self.tried = set()
+        self.widgets = {
+            "combo-manufacturer": "//lightning-combobox[1]",
+            "item-manufacturer": {
+                "Any": "//lightning-combobox[1]//*[@data-value='Any']",
+                "J&J/Janssen": "//lightning-combobox[1]//*[@data-value='Janssen']",
+                "Janssen": "//lightning-combobox[1]//*[@data-value='Janssen']",
+                "Moderna": "//lightning-combobox[1]//*[@data-value='Moderna']",
+                "Pfizer": "//lightning-combobox[1]//*[@data-value='Pfizer']",
+            },
+            "combo-date": "//lightning-combobox[2]",
+            "items-date": "//lightning-combobox[2]//*//lightning-base-combobox-item",
+            "item-date": [
+                "//lightning-combobox[2]//*//lightning-base-combobox-item[10]/span[2]/span",
+            ],
+            "combo-time": "//lightning-combobox[3]",
+            "items-time": "//lightning-combobox[3]//*//lightning-base-combobox-item",
+            "item-time": [
+                "//lightning-combobox[3]//*//lightning-base-combobox-item[1]/span[2]/span",
+            ],
+            "button-continue": "//lightning-button/button",
+            "sucka": "//*[contains(text(), 'There are no available time slots.')]",
+        }
+
+    def populate(self, patientData):
+        self._logger.info("Populating the Appointment form")
+        started = self.commands
+        try:
+            return self.select(patientData)
+        finally:
+            self._logger.info(f"Appointment form took {self.commands - started} WebDriver commands")
+
+    def options(self, combo, items):
+        return self.expand(self.widgets[combo], self.widgets[items]) or []
+
+    def choose(self, combo, items, option, reopen):
+        """Click ``option``; with ``reopen`` the combobox closed since it was read, so reopen it and find it again
+        """
+        if reopen:
+            option = next((o for o in self.options(combo, items) if o["label"] == option["label"]), None)
+            if option is None:
+                return False
+        option["element"].click()
+        return True
+
+    def select(self, patientData):
+        # for each manufacturer the patient will accept, read the date options
+        # once and go straight to the best of them, then likewise for its time
+        # options; only a few of each are tried before moving on
+        # problem here is this form is dynamic, uses shadow DOM, and errors out _lots_ of ways
+        preferences = SlotPreferences.fromPatient(patientData, today=self._today())
+        for m in preferences.manufacturers:
+            self._logger.info(f"Selecting shot: {m}")
+            item = self.widgets["item-manufacturer"].get(m)
+            shot = item and self.expand(self.widgets["combo-manufacturer"], item)
+            if not shot:
+                self._logger.info(f"Manufacturer {m} is not offered, continuing")
+                continue
+            shot[0]["element"].click()
+            try:
+                self.wait(self.widgets["combo-date"], self.timeout("manufacturer", 1), step="manufacturer")
+                self._logger.info(f"Manufacturer successfully selected as {m}")
+            except TimeoutException:
+                self._logger.info("Appointment date combobox is unavailable, continuing")
+                continue
+            dateOptions = self.options("combo-date", "items-date")
+            dates = preferences.rankDates(dateOptions)
+            if not dates:
+                self._logger.info(f"None of the {len(dateOptions)} dates for {m} suit the patient, continuing")
+                continue
+            self._logger.info(f"Trying {', '.join(d['label'] for d in dates)} of {len(dateOptions)} dates for {m}")
+            for d, date in enumerate(dates):
+                if not self.choose("combo-date", "items-date", date, reopen=d > 0):
+                    continue
+                try:
+                    self.wait(self.widgets["combo-time"], self.timeout("date", 1), step="date")
+                    self._logger.info(f"Date {date['label']} successfully selected for {m}")
+                except TimeoutException:
+                    self._logger.info("Appointment time combobox is unavailable, continuing")
+                    continue
+                timeOptions = self.options("combo-time", "items-time")
+                times = preferences.rankTimes([o for o in timeOptions if (m, date["label"], o["label"]) not in self.tried])
+                if not times:
+                    self._logger.info(f"None of the {len(timeOptions)} time slots suit the patient, continuing")
+                    continue
+                for t, slot in enumerate(times):
+                    if not self.choose("combo-time", "items-time", slot, reopen=t > 0):
+                        continue
+                    try:
+                        self.wait(self.widgets["button-continue"], self.timeout("time", 1), step="time")
+                        self._logger.info(f"Time slot {slot['label']} successfully selected for {m}")
+                        self.tried.add((m, date["label"], slot["label"]))
+                        return True
+                    except TimeoutException:
+                        self._logger.info("Continue button is unavailable, continuing")
+        return False
+    
+    def load(self, url, navigate=True):
+        self._logger.info("Loading the Appointment Form")
+        # give up as soon as the page says there is nothing left instead of waiting for the form
+        found = super().load(
+            url, self.widgets["combo-manufacturer"], self.timeout("load"), alternatives=[self.widgets["sucka"]], navigate=navigate
+        )
+        return found == self.widgets["combo-manufacturer"] and not self.soldOut()
+
+    def soldOut(self):
+        return bool(self.isPresent(self.widgets["sucka"]))
+
+    def proceed(self):
+        self._logger.info("Proceeding from the Appointment Form to the next page")
+        self.scrollTo(self.widgets["button-continue"], click=True)
+
+class PatientForm(Page):
+    # fill the whole form with one injected script before trying field by field
+    fastFill = True
+
+    def __init__(self, driver, logger):
+        super().__init__(driver, logger)
+        self.widgets = {
+            "text-firstname": "//input[contains(@name, 'First_Name')]",
+            "text-lastname": "//input[contains(@name, 'Last_Name')]",
+            "text-email": "//input[contains(@name, 'Email_Address')]",
+            "text-birthdate": "//input[@data-type='birthdate']",
+            "text-phone": "//input[@data-type='tel']",
+            "text-peoplesoft": "//lightning-input[4]//*//input",
+            "combo-provider": "//lightning-combobox[1]",
+            "item-provider": {
+                "yes": "//lightning-combobox[1]//*//lightning-base-combobox-item[1]/span[2]/span",
+                "no": "//lightning-combobox[1]//*//lightning-base-combobox-item[2]/span[2]/span",
+            },
+            "text-provider": "//lightning-input[5]//*//input",
+            "text-providerid": "//lightning-input[6]//*//input",
+            "text-groupnumber": "//lightning-input[6]//*//input",
+            "combo-phase": "//lightning-combobox[2]",
+            "item-phase": {
+                "phase1": "//lightning-combobox[2]//*//lightning-base-combobox-item[1]/span[2]/span",
+                "phase1b": "//lightning-combobox[2]//*//lightning-base-combobox-item[2]/span[2]/span",
+                "phase1bplus": "//lightning-combobox[2]//*//lightning-base-combobox-item[3]/span[2]/span",
+                "phase1c": "//lightning-combobox[2]//*//lightning-base-combobox-item[4]/span[2]/span",
+                #"phase2": "//lightning-combobox[2]//*//lightning-base-combobox-item[5]/span[2]/span"
+            },
+            "button-schedule": "//lightning-button[2]/button",
+        }
+
+    def populate(self, patientData):
+        self._logger.info("Populating the Patient form")
+        started = self.commands
+        filled = self.fastFill and self.fillAll(patientData)
+        if not filled:
+            self._logger.info("Scripted fill did not verify, falling back to entering each field")
+            filled = self.populateFields(patientData)
+        self._logger.info(f"Patient form took {self.commands - started} WebDriver commands")
+        return filled
+
+    def fillAll(self, patientData):
+        fields = [
+            (self.widgets["text-" + key], patientData[key])
+            for key in ("firstname", "lastname", "email", "birthdate", "phone", "peoplesoft", "provider", "providerid", "groupnumber")
+            if patientData.get(key)
+        ]
+        provider = "yes" if patientData.get("provider") else "no"
+        choices = [
+            (self.widgets["combo-provider"], self.widgets["item-provider"][provider]),
+            (self.widgets["combo-phase"], self.widgets["item-phase"][patientData["certify"].lower()]),
+        ]
+        return self.fill(fields, choices)
+
+    def populateFields(self, patientData):
+        self._logger.info("Populating the Patient form one field at a time")
+
+        # first the mandatory text fields
+        self.scrollTo(self.widgets["text-firstname"])
+        self.sendKeys(self.widgets["text-firstname"], patientData["firstname"], clear=True)
+        self.scrollTo(self.widgets["text-lastname"])
+        self.sendKeys(self.widgets["text-lastname"], patientData["lastname"], clear=True)
+        self.scrollTo(self.widgets["text-email"])
+        self.sendKeys(self.widgets["text-email"], patientData["email"], clear=True)
+        self.scrollTo(self.widgets["text-birthdate"])
+        self.sendKeys(self.widgets["text-birthdate"], patientData["birthdate"], clear=True)
+        self.scrollTo(self.widgets["text-phone"])
+        self.sendKeys(self.widgets["text-phone"], patientData["phone"], clear=True)
+
+        self.scrollTo(self.widgets["text-peoplesoft"], click=True)
+        if "peoplesoft" in patientData.keys() and patientData["peoplesoft"]:
+            self.sendKeys(self.widgets["text-peoplesoft"], patientData["peoplesoft"], clear=True)
+
+        self.scrollTo(self.widgets["combo-provider"], click=True)
+        if "provider" in patientData.keys() and patientData["provider"]:
+            self.clickOn(self.widgets["item-provider"]["yes"])
+            #click to force the combo closed, just in case
+            self.scrollTo(self.widgets["text-provider"], click=True)
+            self.sendKeys(self.widgets["text-provider"], patientData["provider"], clear=True)
+        else:
+            self.clickOn(self.widgets["item-provider"]["no"])
+
+        #clear the state, make sure none of the drop downs are open
+        self.scrollTo(self.widgets["text-providerid"], click=True)
+        if "providerid" in patientData.keys() and patientData["providerid"]:
+            self.sendKeys(self.widgets["text-providerid"], patientData["providerid"], clear=True)
+        
+        self.scrollTo(self.widgets["text-groupnumber"], click=True)
+        if "groupnumber" in patientData.keys() and patientData["groupnumber"]:
+            self.sendKeys(self.widgets["text-groupnumber"], patientData["groupnumber"], clear=True)
+
+        self.scrollTo(self.widgets["combo-phase"], click=True)
+        self.clickOn(self.widgets["item-phase"][patientData["certify"].lower()])
+        return True
+
+    def load(self):
+        self._logger.info("Loading the Appointment Form")
+        #can't directly load, just confirm the page loaded from the prior proceed
+        try:
+            self.wait(self.widgets["button-schedule"], self.timeout("patient"), step="patient")
+        except TimeoutException:
+            return False
+        return True
+    
+    def proceed(self):
+        self._logger.info("Proceeding from the Patient Form to the next page")
+        self.scrollTo(self.widgets["button-schedule"], click=True)
+
+class ConfirmationPage(Page):
+
+    def __init__(self, driver, logger):
+        super().__init__(driver, logger)
+        self.widgets = {
+            "text-confirmed": "//*[contains(text(), 'confirmed') or contains(text(), 'Confirmed')]",
+        }
+
+    def load(self):
+        self._logger.info("Waiting for the Confirmation page")
+        #clicking schedule proves nothing, only this page says the booking went through
+        try:
+            self.wait(self.widgets["text-confirmed"], self.timeout("confirmation"), step="confirmation")
+        except TimeoutException:
+            return False
+        return True
@@ -0,0 +1,176 @@
+import threading
+import time
+from bisect import bisect_right
+
+from . import Distributor
+from ..base.location import Location
+from ..base.recorder import readRecording
+
+
+class ReplayFinished(Exception):
+    """The simulated clock ran past the end of the recording"""
+
+
+class Replay(object):
+    """A FeedRecorder recording, played back on a simulated clock
+
+    The clock starts at the first snapshot and only moves through sleep(), so
+    a day of recorded feed is replayed as fast as the pipeline can process it.
+    With a ``speed`` every sleep also takes that many times less real time,
+    1.0 replaying in real time.
+    """
+
+    def __init__(self, path, speed=None):
+        self.speed = speed
+        self.times = []
+        self.snapshots = []
+        # store name -> sorted times at which it went from closed to open
+        self.openings = {}
+        previous = set()
+        for at, records in readRecording(path):
+            locations = [Location.fromFeed(record) for record in records]
+            names = {loc.name for loc in locations}
+            for name in names - previous:
+                self.openings.setdefault(name, []).append(at)
+            previous = names
+            self.times.append(at)
+            self.snapshots.append(locations)
+        if not self.times:
+            raise ValueError(f"{path} holds no snapshots")
+        self.clock = self.times[0]
+        self._lock = threading.Lock()
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    @property
+    def done(self):
+        return self.clock > self.end
+
+    def rewind(self):
+        self.clock = self.times[0]
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.clock += seconds
+        if self.speed:
+            time.sleep(seconds / self.speed)
+
+    def advance(self, until):
+        """Move the clock forward to ``until``, if it isn't there yet
+        """
+        if until > self.clock:
+            self.sleep(until - self.clock)
+
+    def frame(self, at=None):
+        """Index of the snapshot current at ``at`` (default now)
+        """
+        return max(bisect_right(self.times, self.clock if at is None else at) - 1, 0)
+
+    def isOpen(self, name, at):
+        return any(loc.name == name for loc in self.snapshots[self.frame(at)])
+
+    def openedAt(self, name, at=None):
+        """When the opening of store ``name`` current at ``at`` happened, None if there is none
+        """
+        openings = self.openings.get(name, [])
+        index = bisect_right(openings, self.clock if at is None else at)
+        return openings[index - 1] if index else None
+
+
+class ReplayDistributor(Distributor):
+    """A distributor whose feed is a Replay and whose bookings are simulated
+
+    Polls return the snapshot current on the simulated clock, or None when it
+    hasn't changed since the previous poll, and go through the regular monitor,
+    Filter and schedule code. A booking attempt takes ``bookingSeconds`` of
+    simulated time and succeeds if its store still has slots by the end of it.
+    Attempts raced by scheduleParallel run side by side, ``concurrency`` at a
+    time. ``lags`` collects how long after opening each store was detected.
+    """
+
+    def __init__(self, replay, logger, bookingSeconds=20.0, cache=None):
+        super().__init__("Replay", None, logger, cache=cache)
+        self.replay = replay
+        self.bookingSeconds = bookingSeconds
+        self.lags = []
+        self.polls = 0
+        self.attempts = 0
+        self.bookings = []
+        self._frame = None
+        self._seen = set()
+        self._wave = None
+        self._lock = threading.Lock()
+
+    def pace(self, delay):
+        self.replay.sleep(delay if self.scheduler is None else self.scheduler.next())
+
+    def checkAvailability(self):
+        if self.replay.done:
+            raise ReplayFinished(f"Replay ended at {self.replay.end}")
+        self.polls += 1
+        frame = self.replay.frame()
+        if frame == self._frame:
+            return None
+        self._frame = frame
+        locations = self.replay.snapshots[frame]
+        names = {loc.name for loc in locations}
+        for name in names - self._seen:
+            opened = self.replay.openedAt(name)
+            if opened is not None:
+                self.lags.append(self.replay.clock - opened)
+        self._seen = names
+        return [loc for loc in locations if loc.openTimeslots > 0]
+
+    def process(self, openSlot, patientData, race=None):
+        with self._lock:
+            self.attempts += 1
+            sequential = self._wave is None
+            if sequential:
+                finished = self.replay.clock + self.bookingSeconds
+            else:
+                started, concurrency, attempt = self._wave
+                self._wave = (started, concurrency, attempt + 1)
+                finished = started + self.bookingSeconds * (attempt // concurrency + 1)
+        if sequential:
+            self.replay.advance(finished)
+        if not self.replay.isOpen(openSlot.name, finished):
+            return False
+        if race is not None and not race.claim(openSlot):
+            return False
+        with self._lock:
+            self.bookings.append((finished, openSlot.name))
+        return True
+
+    def scheduleParallel(self, availability, patientdata, concurrency):
+        self._wave = (self.replay.clock, concurrency, 0)
+        try:
+            return super().scheduleParallel(availability, patientdata, concurrency)
+        finally:
+            started, concurrency, attempts = self._wave
+            self._wave = None
+            self.replay.advance(started + self.bookingSeconds * -(-attempts // concurrency))
+
+    def simulate(self, home, restrictions, delay, concurrency=1):
+        """Monitor and book until the recording runs out
+
+        After each booking monitoring carries on, as if for the next patient.
+        Returns a summary of the run.
+        """
+        try:
+            while True:
+                sites = self.monitor(home, restrictions, delay)
+                if concurrency > 1:
+                    self.scheduleParallel(sites, {}, concurrency)
+                else:
+                    self.schedule(sites, {})
+        except ReplayFinished:
+            pass
+        return {
+            "polls": self.polls,
+            "attempts": self.attempts,
+            "bookings": len(self.bookings),
+            "meanLag": sum(self.lags) / len(self.lags) if self.lags else 0.0,
+            "maxLag": max(self.lags, default=0.0),
+        }
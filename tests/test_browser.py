@@ -0,0 +1,30 @@
+import base64
+
+from farquaad.base import browser
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def test_standard_mode_changes_nothing():
+    assert browser.preferences(browser.STANDARD) == {}
+    options = browser.firefoxOptions()
+    assert options.arguments == []
+    assert options.preferences == {}
+
+
+def test_lean_mode_blocks_trackers():
+    prefs = browser.preferences(browser.LEAN)
+    assert prefs["permissions.default.image"] == 2
+    assert prefs["network.proxy.type"] == 2
+    pac = base64.b64decode(prefs["network.proxy.autoconfig_url"].split(",", 1)[1]).decode()
+    assert "doubleclick.net" in pac and "FindProxyForURL" in pac
+
+
+def test_persistent_profile_runs_in_place(tmp_path):
+    profile = str(tmp_path / "profile")
+    options = browser.firefoxOptions(browser.LEAN, profile, headless=True, persistent=True)
+    assert options.arguments == ["-headless", "-profile", profile]
+    assert (tmp_path / "profile").is_dir()
+    assert browser.firefoxOptions(browser.LEAN, profile).arguments == []
@@ -1,25 +1,78 @@
+import json
+
 import pytest
 
-from farquaad.cli import fib, main
+from farquaad.base.geocache import GeoCache
+from farquaad import cli
+from farquaad.base.recorder import readRecording
+from farquaad.cli import parse_args, patients
 
 __author__ = "Jason Switzer"
 __copyright__ = "Jason Switzer"
 __license__ = "MIT"
 
 
-def test_fib():
+def test_parse_args(tmp_path):
+    """CLI Tests"""
+    form = tmp_path / "form.json"
+    form.write_text("{}")
+    args = parse_args(["-P", str(form), "-H", "Austin, TX", "-d", "25", "-z", "78701", "78702", "-k", "3", "--browser-mode", "lean", "--headless"])
+    assert args.home == "Austin, TX"
+    assert args.distance == 25.0
+    assert args.zipcodes == ["78701", "78702"]
+    assert args.parallel == 3
+    assert args.browsermode == "lean" and args.headless
+    assert args.timedelay == 10.0 and not args.adaptive
+    args.patientdata.close()
+
+
+def test_parse_args_validation(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["-H", "Austin, TX", "-d", "25"])
+    assert "--patient-data is required" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        parse_args(["--sanity", "-d", "25"])
+    assert "--distance requires --home" in capsys.readouterr().err
+
+
+def test_patients(tmp_path):
     """API Tests"""
-    assert fib(1) == 1
-    assert fib(2) == 1
-    assert fib(7) == 13
-    with pytest.raises(AssertionError):
-        fib(-10)
+    cache = GeoCache(str(tmp_path))
+    cache.geocode("Austin, TX", lambda address: (30.2672, -97.7431))
+    cache.geocode("Houston, TX", lambda address: (29.7604, -95.3698))
+    lines = [
+        json.dumps({"firstname": "Jane", "lastname": "Doe"}),
+        "",
+        json.dumps({"firstname": "John", "lastname": "Roe", "home": "Houston, TX", "distance": 10}),
+    ]
+    index = patients(lines, {"home": "Austin, TX", "distance": 25, "cities": None, "zipcodes": None}, cache=cache)
+    assert len(index) == 2
+    assert index.patient(0).name == "Jane Doe"
+    assert index.patient(2).refine.restrictions.distance == 10
+    cache.close()
 
 
-def test_main(capsys):
-    """CLI Tests"""
-    # capsys is a pytest fixture that allows asserts agains stdout/stderr
-    # https://docs.pytest.org/en/stable/capture.html
-    main(["7"])
-    captured = capsys.readouterr()
-    assert "The 7-th Fibonacci number is 13" in captured.out
+def test_interrupted_monitor_shuts_down(tmp_path, monkeypatch):
+    form = tmp_path / "form.json"
+    form.write_text("{}")
+    recording = tmp_path / "feed.jsonl.gz"
+
+    def heb(**kwargs):
+        from farquaad.distributors.heb import HEB
+        distributor = HEB(None, kwargs["logger"], cache=kwargs["cache"])
+
+        def monitor(*args, **kwargs):
+            distributor.recorder.record([{"name": "a", "openTimeslots": 1}], at=1.0)
+            raise KeyboardInterrupt
+
+        distributor.monitor = monitor
+        return distributor
+
+    monkeypatch.setattr(cli, "heb", heb)
+    with pytest.raises(KeyboardInterrupt):
+        cli.main([
+            "-P", str(form), "-H", "Austin, TX", "-d", "25", "--record", str(recording),
+            "--cache-dir", str(tmp_path), "--screenshot-mode", "off",
+        ])
+    # the recorder was closed, so the single unflushed record made it to disk
+    assert [at for at, _ in readRecording(str(recording))] == [1.0]
@@ -0,0 +1,52 @@
+import math
+import random
+
+import pytest
+
+from farquaad.base import distance
+from farquaad.base.distance import DistanceEngine, boundingBox, geodesicMiles
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+HOME = (30.2672, -97.7431)
+
+
+def synthetic(count):
+    rng = random.Random(4)
+    return [(HOME[0] + rng.uniform(-2, 2), HOME[1] + rng.uniform(-2, 2)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_engine_matches_geodesic(vectorized, monkeypatch):
+    if not vectorized:
+        monkeypatch.setattr(distance, "numpy", None)
+    coordinates = synthetic(500)
+    radius = 60.0
+    miles = DistanceEngine(HOME, radius).distances(coordinates)
+    for latlong, m in zip(coordinates, miles):
+        exact = geodesicMiles(HOME, latlong)
+        assert (m <= radius) == (exact <= radius)
+        if math.isfinite(m):
+            assert m == pytest.approx(exact, rel=0.006)
+
+
+def test_boundary_refinement_uses_measure():
+    calls = []
+
+    def measure(origin, destination):
+        calls.append(destination)
+        return 10.0
+
+    engine = DistanceEngine(HOME, geodesicMiles(HOME, (30.4, -97.7431)), measure=measure)
+    assert engine.distances([(30.4, -97.7431), (HOME[0] + 0.01, HOME[1])])[0] == 10.0
+    assert len(calls) == 1
+
+
+def test_bounding_box():
+    south, north, west, east = boundingBox(HOME, 50)
+    assert south < HOME[0] < north and west < HOME[1] < east
+    engine = DistanceEngine(HOME, 50)
+    assert engine.distance((HOME[0] + 5, HOME[1])) == math.inf
+    assert engine.distances([]) == []
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from farquaad.base.journey import UnconfirmedBooking
+from farquaad.base.location import Location
+from farquaad.distributors import BookingRace, Distributor
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class RacingDistributor(Distributor):
+    """Stand-in whose booking journeys take a per-site number of steps"""
+
+    def __init__(self, steps):
+        super().__init__("race", None, _logger)
+        self.steps = steps
+        self.submitted = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def process(self, openSlot, patientData, race=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            for _ in range(self.steps[openSlot["name"]]):
+                time.sleep(0.02)
+                if race.cancelled:
+                    return False
+            if self.steps[openSlot["name"]] < 0 or not race.claim(openSlot):
+                return False
+            self.submitted.append(openSlot["name"])
+            return True
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def test_race_books_once():
+    steps = {"a": 20, "b": 3, "c": 5, "d": 1, "e": 2}
+    distributor = RacingDistributor(steps)
+    sites = [Location(name) for name in steps]
+    booked = distributor.scheduleParallel(sites, {}, 3)
+    assert booked["name"] == "b"
+    assert distributor.submitted == ["b"]
+    assert distributor.peak == 3
+
+
+def test_race_moves_on_to_next_sites():
+    distributor = RacingDistributor({"a": -1, "b": -1, "c": 2})
+    booked = distributor.scheduleParallel([Location("a"), Location("b"), Location("c")], {}, 2)
+    assert booked["name"] == "c"
+
+
+class UnconfirmedDistributor(RacingDistributor):
+    """Stand-in whose submits at site "a" never get a confirmation"""
+
+    def __init__(self):
+        super().__init__({"a": 0, "b": 0, "c": 0})
+        self.tried = []
+
+    def process(self, openSlot, patientData, race=None):
+        self.tried.append(openSlot["name"])
+        if openSlot["name"] == "a":
+            if race is not None:
+                race.claim(openSlot)
+            raise UnconfirmedBooking("Submitted at a but no confirmation was shown")
+        return False
+
+
+def test_unconfirmed_booking_stops_scheduling():
+    distributor = UnconfirmedDistributor()
+    with pytest.raises(UnconfirmedBooking):
+        distributor.schedule([Location("a"), Location("b")], {})
+    assert distributor.tried == ["a"]
+
+    distributor = UnconfirmedDistributor()
+    with pytest.raises(UnconfirmedBooking):
+        distributor.scheduleParallel([Location("a"), Location("b"), Location("c")], {}, 1)
+    assert distributor.tried == ["a"]
+
+
+def test_claim_is_exclusive():
+    race = BookingRace()
+    assert not race.cancelled
+    assert race.claim({"name": "a"})
+    assert not race.claim({"name": "b"})
+    assert race.cancelled and race.winner == {"name": "a"}
+
+
+def test_browser_launches_on_demand():
+    launched = []
+
+    def launch():
+        launched.append(threading.current_thread().name)
+        return "driver"
+
+    distributor = Distributor("lazy", None, _logger, launch=launch)
+    distributor.observed([{"name": "a", "openTimeslots": 1}])
+    assert launched == []
+    with distributor.session() as driver:
+        assert driver == "driver"
+    assert launched == ["MainThread"]
+
+    warming = Distributor("warm", None, _logger, launch=launch)
+    warming.warmup = True
+    warming.observed([])
+    assert warming._launching is None
+    warming.observed([{"name": "a", "openTimeslots": 1}])
+    warming._launching.join()
+    assert launched[-1] == "farquaad-warmup"
+    with warming.session() as driver:
+        assert driver == "driver" and len(launched) == 2
@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from farquaad.base.drivers import DriverPool
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.capabilities = {}
+        self.pages = []
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("browser crashed")
+        return 1
+
+    def get(self, url):
+        self.pages.append(url)
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_pool_hands_out_warm_sessions():
+    launched = []
+
+    def factory():
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    pool = DriverPool(factory, _logger, size=2, maxUses=2)
+    first = pool.acquire(timeout=5)
+    second = pool.acquire(timeout=5)
+    assert {first, second} == set(launched)
+
+    pool.release(first)
+    assert first.pages == ["about:blank"]
+    assert pool.acquire(timeout=5) is first
+
+    # second use recycles the session and a fresh one takes its place
+    pool.release(first)
+    assert first.quit_called
+    replacement = pool.acquire(timeout=5)
+    assert replacement not in (first, second)
+
+    pool.close()
+    assert second.quit_called and replacement.quit_called
+
+
+def test_unhealthy_sessions_are_replaced():
+    launched = []
+
+    def factory():
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    pool = DriverPool(factory, _logger, size=1)
+    driver = pool.acquire(timeout=5)
+    pool.release(driver)
+    driver.alive = False
+    fresh = pool.acquire(timeout=5)
+    assert fresh is not driver and driver.quit_called
+    pool.close()
+
+
+def test_failed_launches_are_raised():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise WebDriverException("geckodriver not found")
+        return FakeDriver()
+
+    pool = DriverPool(factory, _logger, size=1)
+    with pytest.raises(WebDriverException, match="geckodriver"):
+        pool.acquire(timeout=5)
+    # the failed slot was launched again
+    assert isinstance(pool.acquire(timeout=5), FakeDriver)
+    pool.close()
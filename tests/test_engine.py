@@ -0,0 +1,107 @@
+import logging
+import time
+
+import pytest
+
+from farquaad.base import Restrictions
+from farquaad.base.geocache import GeoCache
+from farquaad.base.location import Location
+from farquaad.distributors import Distributor
+from farquaad.distributors.engine import MonitorEngine
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+HOME = (30.2672, -97.7431)
+FETCH_SECONDS = 0.2
+
+
+class SlowDistributor(Distributor):
+    """Stand-in distributor whose feed takes FETCH_SECONDS to answer"""
+
+    def __init__(self, name, offset, cache, bookable=True):
+        super().__init__(name, None, _logger, cache=cache)
+        self.offset = offset
+        self.bookable = bookable
+        self.attempts = []
+
+    def checkAvailability(self):
+        time.sleep(FETCH_SECONDS)
+        return [Location(
+            f"{self._name} store", city="Austin", zip="78701", openTimeslots=1,
+            latitude=HOME[0] + self.offset, longitude=HOME[1],
+        )]
+
+    def process(self, openSlot, patientData):
+        self.attempts.append(openSlot["name"])
+        return self.bookable
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = GeoCache(str(tmp_path))
+    cache.geocode("Austin, TX", lambda address: HOME)
+    yield cache
+    cache.close()
+
+
+def run(distributors):
+    engine = MonitorEngine(_logger)
+    for distributor in distributors:
+        engine.add(distributor, 0)
+    started = time.monotonic()
+    booked = engine.book("Austin, TX", Restrictions(cities=None, zipcodes=None, distance=50), {})
+    return engine, booked, time.monotonic() - started
+
+
+def test_many_distributors_poll_as_fast_as_one(cache):
+    _, _, single = run([SlowDistributor("only", 0.01, cache)])
+    distributors = [SlowDistributor(f"d{i}", 0.01 * (i + 1), cache, bookable=(i == 3)) for i in range(8)]
+    engine, (distributor, appt), many = run(distributors)
+    assert distributor is distributors[3]
+    assert appt["name"] == "d3 store"
+    # polled one after another, eight feeds would take 8 * FETCH_SECONDS per round
+    assert many < single + 2 * FETCH_SECONDS
+    # the booking can end before the slowest distributors finish their first poll
+    assert engine.latency["d3"]
+    for latencies in engine.latency.values():
+        assert max(latencies, default=0) < FETCH_SECONDS * 2
+
+
+class FlakyDistributor(SlowDistributor):
+    """Stand-in distributor whose first polls raise"""
+
+    def __init__(self, name, cache, failures):
+        super().__init__(name, 0.01, cache)
+        self.failures = failures
+
+    def checkAvailability(self):
+        if self.failures:
+            self.failures -= 1
+            raise KeyError("locations")
+        return super().checkAvailability()
+
+
+def test_failed_polls_are_retried(cache):
+    engine = MonitorEngine(_logger, backoff=0.01)
+    flaky = FlakyDistributor("flaky", cache, failures=3)
+    engine.add(flaky, 0)
+    distributor, appt = engine.book("Austin, TX", Restrictions(cities=None, zipcodes=None, distance=50), {})
+    assert distributor is flaky and appt["name"] == "flaky store"
+    assert flaky.failures == 0
+    assert engine._interval(flaky, 0, 3) == 0.04
+
+
+def test_merged_ranking(cache):
+    engine = MonitorEngine(_logger)
+    a, b = SlowDistributor("a", 0, cache), SlowDistributor("b", 0, cache)
+    engine._latest[a] = [Location("a1", distance=1.0), Location("a2", distance=7.0)]
+    engine._latest[b] = [Location("b1", distance=3.0)]
+    assert [(d, x._name, appt["name"]) for d, x, appt in engine.ranked()] == [
+        (1.0, "a", "a1"),
+        (3.0, "b", "b1"),
+        (7.0, "a", "a2"),
+    ]
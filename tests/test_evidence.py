@@ -0,0 +1,80 @@
+import logging
+import threading
+
+import pytest
+
+from farquaad.base import evidence
+from farquaad.base.evidence import EvidenceWriter
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FakePage(object):
+    def __init__(self):
+        self.shots = 0
+
+    def screenshot(self):
+        self.shots += 1
+        return b"\x89PNG fake"
+
+
+def attempt(writer, booked):
+    page = FakePage()
+    shots = writer.attempt("H-E-B Austin #1")
+    for step in ("appointment", "patient", "confirmation" if booked else None):
+        if step:
+            shots.capture(page, step)
+    shots.finish(booked, page)
+    return page.shots
+
+
+def written(path):
+    return sorted(name.rsplit("-", 1)[1] for name in (p.name for p in path.iterdir()))
+
+
+@pytest.mark.parametrize("mode, booked, expected", [
+    (evidence.ALWAYS, True, ["appointment.png", "confirmation.png", "patient.png"]),
+    (evidence.SUBMIT, True, ["confirmation.png"]),
+    (evidence.SUBMIT, False, []),
+    (evidence.FAILURE, True, []),
+    (evidence.FAILURE, False, ["failed.png"]),
+])
+def test_modes(tmp_path, mode, booked, expected):
+    directory = tmp_path / "shots" / "nested"
+    writer = EvidenceWriter(str(directory), _logger, mode=mode, scale=1)
+    assert attempt(writer, booked) == len(expected)
+    writer.close()
+    assert (written(directory) if expected else []) == expected
+    assert writer.written == len(expected)
+
+
+class StalledWriter(EvidenceWriter):
+    """Writer whose disk is stuck until released"""
+
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _write(self, name, png):
+        self.release.wait(5)
+        super()._write(name, png)
+
+
+def test_slow_disk_never_blocks_capture(tmp_path):
+    writer = StalledWriter(str(tmp_path), _logger, queueSize=1, scale=1)
+    for _ in range(3):
+        attempt(writer, True)
+    # at most one screenshot on the stalled disk and one queued, the rest dropped
+    assert writer.dropped >= 7
+    writer.release.set()
+    writer.close()
+    assert writer.written + writer.dropped == 9
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        EvidenceWriter("shots", _logger, mode="sometimes")
@@ -0,0 +1,128 @@
+import gzip
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from farquaad.base.feed import FeedPoller, iterArray
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if server.etag and self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = server.body
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        if server.etag:
+            self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    httpd.requests = []
+    httpd.etag = None
+    httpd.body = json.dumps({"locations": [{"name": "A", "openTimeslots": 1}]}).encode()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(httpd):
+    return f"http://127.0.0.1:{httpd.server_address[1]}/vaccine_locations.json"
+
+
+def test_gzip_and_validators(server):
+    server.etag = '"v1"'
+    feed = FeedPoller(url(server), _logger)
+    assert json.loads(feed.fetch())["locations"][0]["name"] == "A"
+    assert feed.etag == '"v1"'
+    assert feed.fetch() is None
+    assert feed.status == 304
+    assert server.requests[0]["Accept-Encoding"] == "gzip"
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    feed.close()
+
+
+def test_identical_body_short_circuits(server):
+    feed = FeedPoller(url(server), _logger)
+    assert feed.fetch() is not None
+    assert feed.fetch() is None
+    assert feed.status == 200
+    server.body = b'{"locations": []}'
+    assert feed.fetch() == b'{"locations": []}'
+    feed.close()
+
+
+def test_connection_failure():
+    feed = FeedPoller("http://127.0.0.1:9/vaccine_locations.json", _logger, timeout=0.5)
+    assert feed.fetch() is None
+    assert feed.status is None
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_iter_array(size):
+    document = {
+        "meta": {"locations": "not this one"},
+        "locations": [{"name": "Café {1}", "zip": "78701"}, {"name": "B \\\"]", "nested": [1, {"a": 2}]}],
+        "after": True,
+    }
+    data = json.dumps(document, indent=2).encode()
+    assert list(iterArray(chunked(data, size), "locations")) == document["locations"]
+
+
+def test_iter_array_truncated():
+    with pytest.raises(ValueError):
+        list(iterArray([b'{"locations": [{"name": "A"}, {"na'], "locations"))
+
+
+def test_stream(server):
+    server.etag = '"v1"'
+    server.body = json.dumps({"locations": [{"name": str(i)} for i in range(2000)]}).encode()
+    feed = FeedPoller(url(server), _logger)
+    names = [loc["name"] for loc in iterArray(feed.stream(), "locations")]
+    assert names == [str(i) for i in range(2000)]
+    assert feed.etag == '"v1"'
+    assert list(feed.stream()) == []
+    assert feed.status == 304
+    feed.close()
+
+
+def test_abandoned_stream_keeps_validators(server):
+    server.etag = '"v1"'
+    feed = FeedPoller(url(server), _logger)
+    for loc in iterArray(feed.stream(), "locations"):
+        break
+    assert feed.etag is None
+    assert [loc["name"] for loc in iterArray(feed.stream(), "locations")] == ["A"]
+    feed.close()
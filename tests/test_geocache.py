@@ -0,0 +1,51 @@
+from farquaad.base.geocache import GeoCache, normalizeAddress
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def test_normalize_address():
+    assert normalizeAddress("  123 Main  St ,Austin,TX   78701 ") == "123 main st, austin, tx 78701"
+
+
+def test_geocode_persists(tmp_path):
+    calls = []
+
+    def resolve(address):
+        calls.append(address)
+        return None if address == "nowhere" else (30.2672, -97.7431)
+
+    cache = GeoCache(str(tmp_path))
+    assert cache.geocode("Austin, TX", resolve) == (30.2672, -97.7431)
+    assert cache.geocode("nowhere", resolve) is None
+    cache.close()
+
+    cache = GeoCache(str(tmp_path))
+    assert cache.geocode("austin,  tx", resolve) == (30.2672, -97.7431)
+    assert cache.geocode("nowhere", resolve) is None
+    assert calls == ["Austin, TX", "nowhere"]
+    cache.close()
+
+
+def test_distance_ttl(tmp_path):
+    cache = GeoCache(str(tmp_path), ttl=-1)
+    calls = []
+
+    def measure(origin, destination):
+        calls.append((origin, destination))
+        return 12.5
+
+    assert cache.distance((30.0, -97.0), (30.1, -97.1), measure) == 12.5
+    assert cache.distance((30.0, -97.0), (30.1, -97.1), measure) == 12.5
+    assert len(calls) == 2
+    cache.close()
+
+
+def test_eviction(tmp_path):
+    cache = GeoCache(str(tmp_path), maxEntries=3)
+    for i in range(5):
+        cache.distance((30.0, -97.0), (30.0 + i, -97.0), lambda o, d: float(d[0]))
+    count = cache._db.execute("SELECT COUNT(*) FROM distance").fetchone()[0]
+    assert count == 3
+    cache.close()
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+# packages only booking, geocoding or the async engine may load
+HEAVY = ("selenium", "pyvirtualdisplay", "geopy", "numpy", "asyncio", "importlib.metadata")
+
+# cumulative import time of farquaad.cli, in microseconds; about 60ms at the
+# time of writing, most of it argparse and logging
+BUDGET = 150000
+
+
+def importtime(statement):
+    """Cumulative import time of every module loaded by ``statement``, from python -X importtime
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_nothing_heavy():
+    times = importtime("import farquaad.cli; farquaad.cli.parse_args(['--sanity'])")
+    heavy = [name for name in times if name.startswith(HEAVY)]
+    assert heavy == []
+    assert times["farquaad.cli"] < BUDGET
+
+
+def test_monitoring_does_not_load_selenium():
+    times = importtime("from farquaad.base import Filter; from farquaad.distributors.heb import HEB")
+    assert "numpy" in times or "geopy" in times
+    assert not [name for name in times if name.startswith("selenium")]
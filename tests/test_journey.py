@@ -0,0 +1,123 @@
+import logging
+
+import pytest
+
+from farquaad.base.journey import CONFIRMED, FAILED, LOADED, START, Journey, UnconfirmedBooking
+from farquaad.base.location import Location
+from farquaad.distributors import BookingRace
+from farquaad.distributors.heb import HEB
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+def test_steps_resume_and_give_up():
+    outcomes = iter([LOADED, START, LOADED, CONFIRMED])
+    journey = Journey(_logger)
+    journey.on(START, lambda: next(outcomes)).on(LOADED, lambda: next(outcomes))
+    assert journey.run()
+    assert [state for state, _ in journey.checkpoints] == [LOADED, START, LOADED, CONFIRMED]
+
+    def broken():
+        raise RuntimeError("stale element")
+
+    journey = Journey(_logger, retries=1).on(START, broken)
+    assert not journey.run()
+    assert journey.visits[START] == 2 and journey.state == FAILED
+
+    journey = Journey(_logger).on(START, broken, once=True)
+    assert not journey.run()
+    assert journey.visits[START] == 1
+
+
+class FakeForm(object):
+    """Appointment or patient page stand-in following a script of outcomes"""
+
+    def __init__(self, loads=(), fills=(), soldOut=False, clickFails=False):
+        self.loads = list(loads)
+        self.fills = list(fills)
+        self.calls = []
+        self._soldOut = soldOut
+        self.clickFails = clickFails
+
+    def load(self, url=None, navigate=True):
+        self.calls.append("load" if navigate else "preloaded")
+        return self.loads.pop(0)
+
+    def populate(self, patientData):
+        self.calls.append("populate")
+        return self.fills.pop(0)
+
+    def proceed(self):
+        self.calls.append("proceed")
+        if self.clickFails:
+            raise RuntimeError("stale element")
+
+    def soldOut(self):
+        return self._soldOut
+
+
+class Captures(object):
+    """Evidence attempt stand-in, remembering the steps captured"""
+
+    def __init__(self):
+        self.steps = []
+
+    def capture(self, page, step):
+        self.steps.append(step)
+
+
+def book(appointment, patient, race=None, prefetched=False, confirm=None, evidence=None):
+    heb = HEB(None, _logger)
+    pages = appointment, patient, confirm or FakeForm(loads=[True])
+    return heb.book(pages, Location("store", url="https://example.com"), {}, race, prefetched, evidence)
+
+
+def test_taken_slot_is_replaced_on_the_same_page():
+    appointment = FakeForm(loads=[True], fills=[True, True])
+    patient = FakeForm(loads=[False, True], fills=[False, True])
+    race = BookingRace()
+    assert book(appointment, patient, race, prefetched=True)
+    # one (preloaded) appointment page, a second slot picked on it, the patient form filled twice in place
+    assert appointment.calls == ["preloaded", "populate", "proceed", "populate", "proceed"]
+    assert patient.calls == ["load", "load", "populate", "populate", "proceed"]
+    assert race.winner.name == "store"
+
+
+def test_only_exhaustion_gives_up():
+    slow = FakeForm(loads=[False, True, True], fills=[False, False])
+    assert not book(slow, FakeForm())
+    # a slow load is retried, then fresh pages are tried until loading runs out of retries
+    assert slow.calls == ["load", "load", "populate", "load", "populate"]
+
+    soldOut = FakeForm(loads=[False], soldOut=True)
+    assert not book(soldOut, FakeForm())
+    assert soldOut.calls == ["load"]
+
+
+def test_lost_race_stops():
+    race = BookingRace()
+    race.claim(Location("elsewhere"))
+    patient = FakeForm(loads=[True], fills=[True])
+    assert not book(FakeForm(loads=[True], fills=[True]), patient, race)
+    assert "proceed" not in patient.calls
+
+
+def test_submitting_is_never_repeated():
+    # the schedule click broke, whether it went through only the confirmation can tell
+    patient = FakeForm(loads=[True], fills=[True], clickFails=True)
+    assert book(FakeForm(loads=[True], fills=[True]), patient)
+    assert patient.calls.count("proceed") == 1
+
+    # submitted, but the confirmation never showed up
+    patient = FakeForm(loads=[True], fills=[True])
+    confirm = FakeForm(loads=[False, True])
+    evidence = Captures()
+    with pytest.raises(UnconfirmedBooking):
+        book(FakeForm(loads=[True], fills=[True]), patient, confirm=confirm, evidence=evidence)
+    assert patient.calls.count("proceed") == 1 and confirm.calls == ["load"]
+    # the page shown instead of the confirmation is kept
+    assert evidence.steps[-1] == "confirmation"
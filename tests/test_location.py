@@ -0,0 +1,39 @@
+import sys
+from array import array
+
+from farquaad.base.distance import DistanceEngine
+from farquaad.base.location import Location
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+RECORD = {
+    "name": "H-E-B Austin #1", "storeNumber": 1, "street": "100 Main St", "city": "Austin", "state": "TX",
+    "zip": "78701", "latitude": "30.27", "longitude": -97.74, "type": "store", "openTimeslots": 2,
+    "slotDetails": [], "url": "https://example.com/book",
+}
+
+
+def test_from_feed_keeps_used_fields():
+    loc = Location.fromFeed(RECORD)
+    assert loc.latitude == 30.27 and loc.openTimeslots == 2 and loc.distance is None
+    assert loc.city is sys.intern("Austin") and loc.zip is sys.intern("78701")
+    assert not hasattr(loc, "__dict__")
+    # item access and dict() still work like the raw feed dict
+    assert loc["name"] == RECORD["name"] and loc.get("storeNumber") is None
+    assert "distance" not in loc and dict(loc)["url"] == RECORD["url"]
+    assert Location.fromFeed(dict(loc)) == loc
+
+
+def test_located_copies():
+    loc = Location.fromFeed(RECORD)
+    near = loc.located(1.5)
+    assert near.distance == 1.5 and loc.distance is None
+    assert near.name == loc.name and near != loc
+
+
+def test_coordinate_columns():
+    engine = DistanceEngine((30.2672, -97.7431), 50)
+    latitudes, longitudes = array("d", [30.2672, 29.7604]), array("d", [-97.7431, -95.3698])
+    assert engine.distancesOf(latitudes, longitudes) == engine.distances(list(zip(latitudes, longitudes)))
@@ -0,0 +1,72 @@
+from farquaad.base import Filter, Restrictions
+from farquaad.base.geocache import GeoCache
+from farquaad.base.location import Location
+from farquaad.base.matcher import Patient, PatientIndex
+from farquaad.base.snapshot import Snapshot
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+HOMES = {
+    "Austin, TX": (30.2672, -97.7431),
+    "Houston, TX": (29.7604, -95.3698),
+}
+
+
+def store(name, city, zipcode, latlong, slots=1):
+    return Location(name, city=city, zip=zipcode, latitude=latlong[0], longitude=latlong[1], openTimeslots=slots)
+
+
+def build(tmp_path, specs):
+    cache = GeoCache(str(tmp_path))
+    for home, latlong in HOMES.items():
+        cache.geocode(home, lambda address: latlong)
+    index = None
+    for key, (home, restrictions) in enumerate(specs):
+        refine = Filter(home, restrictions, cache=cache)
+        if index is None:
+            index = PatientIndex(refine.coordinates)
+        index.add(Patient(key, {"firstname": f"P{key}"}, refine))
+    return index
+
+
+def test_openings_are_routed_to_matching_patients(tmp_path):
+    index = build(tmp_path, [
+        ("Austin, TX", Restrictions(cities=None, zipcodes=None, distance=30)),
+        ("Houston, TX", Restrictions(cities=None, zipcodes=None, distance=30)),
+        ("Austin, TX", Restrictions(cities=None, zipcodes=["78664"], distance=None)),
+        ("Austin, TX", Restrictions(cities=["Houston"], zipcodes=None, distance=None)),
+    ])
+    snapshot = Snapshot()
+    austin = store("Austin Store", "Austin", "78701", (30.27, -97.74))
+    roundrock = store("Round Rock Store", "Round Rock", "78664", (30.51, -97.67))
+    houston = store("Houston Store", "Houston", "77002", (29.76, -95.37))
+
+    matched = index.update(snapshot.update([austin, roundrock, houston]))
+    assert matched == {0, 1, 2, 3}
+    assert [loc["name"] for loc in index.ranking(0)] == ["Austin Store", "Round Rock Store"]
+    assert [loc["name"] for loc in index.ranking(1)] == ["Houston Store"]
+    assert [loc["name"] for loc in index.ranking(2)] == ["Round Rock Store"]
+    assert [loc["name"] for loc in index.ranking(3)] == ["Houston Store"]
+    assert index.ranking(0)[0]["distance"] < 1
+
+    assert index.update(snapshot.update([austin, houston])) == set()
+    assert [loc["name"] for loc in index.ranking(0)] == ["Austin Store"]
+    assert index.ranking(2) == []
+
+    index.remove(0)
+    assert len(index) == 3
+    assert index.update(snapshot.update([austin, houston, roundrock.located(None)])) == {2}
+
+
+def test_zip_prefixes_and_city_case(tmp_path):
+    index = build(tmp_path, [
+        ("Austin, TX", Restrictions(cities=None, zipcodes=["787*"], distance=None)),
+        ("Austin, TX", Restrictions(cities=["round  rock"], zipcodes=None, distance=None)),
+    ])
+    austin = store("Austin Store", "Austin", "78701-1234", (30.27, -97.74))
+    roundrock = store("Round Rock Store", "Round Rock", "78664", (30.51, -97.67))
+    assert index.update(Snapshot().update([austin, roundrock])) == {0, 1}
+    assert [loc.name for loc in index.ranking(0)] == ["Austin Store"]
+    assert [loc.name for loc in index.ranking(1)] == ["Round Rock Store"]
@@ -0,0 +1,59 @@
+import urllib.request
+
+from farquaad.base.metrics import Exporter, Histogram, Metrics
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.max == 2.0
+
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    with metrics.timed("filter"):
+        pass
+    metrics.observe("phase_seconds", 0.3, phase="page_load")
+    metrics.count("feed_responses_total", status=304)
+    metrics.count("feed_responses_total", status=304)
+    text = metrics.render()
+    assert "# TYPE farquaad_feed_responses_total counter" in text
+    assert 'farquaad_feed_responses_total{status="304"} 2' in text
+    assert "# TYPE farquaad_phase_seconds histogram" in text
+    assert 'farquaad_phase_seconds_bucket{phase="page_load",le="0.5"} 1' in text
+    assert 'farquaad_phase_seconds_count{phase="filter"} 1' in text
+    assert metrics.histogram("phase_seconds", phase="page_load").count == 1
+    assert any(line.startswith("page_load") for line in metrics.summary())
+
+
+def test_mixed_label_value_types():
+    metrics = Metrics()
+    metrics.count("feed_responses_total", status=200)
+    metrics.count("feed_responses_total", status="error")
+    metrics.observe("request_seconds", 0.1, status=200)
+    metrics.observe("request_seconds", 0.2, status="error")
+    text = metrics.render()
+    assert 'farquaad_feed_responses_total{status="200"} 1' in text
+    assert 'farquaad_feed_responses_total{status="error"} 1' in text
+    assert 'feed_responses_total{status="error"} 1' in metrics.summary()
+    assert metrics.counter("feed_responses_total", status=200) == 1
+
+
+def test_exporter_serves_and_writes(tmp_path):
+    metrics = Metrics()
+    metrics.count("bookings_total")
+    path = tmp_path / "farquaad.prom"
+    exporter = Exporter(metrics, path=str(path), port=0, interval=60)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            assert b"farquaad_bookings_total 1" in response.read()
+    finally:
+        exporter.close()
+    assert "farquaad_bookings_total 1" in path.read_text()
@@ -0,0 +1,141 @@
+import logging
+
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+
+from farquaad.base import Page
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FakeElement(object):
+    def __init__(self, driver, xpath):
+        self.driver = driver
+        self.xpath = xpath
+        self.stale = False
+
+    def click(self):
+        if self.stale:
+            raise StaleElementReferenceException(self.xpath)
+        self.driver.execute("clickElement", {"xpath": self.xpath})
+
+
+class FakeDriver(object):
+    """Just enough of a WebDriver to route every command through execute()"""
+
+    def __init__(self):
+        self.log = []
+
+    def execute(self, command, params=None):
+        self.log.append(command)
+        return params
+
+    def find_element_by_xpath(self, xpath):
+        self.execute("findElement", {"xpath": xpath})
+        return FakeElement(self, xpath)
+
+    def execute_script(self, script, *args):
+        return self.execute("executeScript", {"args": args})
+
+
+def test_commands_are_counted_and_handles_cached():
+    driver = FakeDriver()
+    page = Page(driver, _logger)
+    Page(driver, _logger)
+    page.clickOn("//button")
+    page.clickOn("//button")
+    assert driver.log == ["findElement", "clickElement", "clickElement"]
+    assert page.commands == 3
+
+
+def test_stale_handles_are_resolved_again():
+    driver = FakeDriver()
+    page = Page(driver, _logger)
+    page.clickOn("//button")
+    page.handle("//button").stale = True
+    page.clickOn("//button")
+    assert driver.log == ["findElement", "clickElement", "findElement", "clickElement"]
+
+
+class FillingDriver(FakeDriver):
+    def __init__(self, readback):
+        super().__init__()
+        self.readback = readback
+
+    def set_script_timeout(self, timeout):
+        self.execute("setTimeouts", {"script": timeout})
+
+    def execute_async_script(self, script, fields, choices):
+        self.execute("executeAsyncScript", {"fields": fields, "choices": choices})
+        return {"missing": [], "values": [self.readback.get(xpath, value) for xpath, value in fields]}
+
+
+def test_fill_is_one_round_trip():
+    driver = FillingDriver({})
+    page = Page(driver, _logger)
+    fields = [("//input[1]", "Jane"), ("//input[2]", "Doe"), ("//input[2]", "Roe")]
+    assert page.fill(fields, [("//combo", "//combo//item")])
+    assert page.fill(fields)
+    assert driver.log == ["setTimeouts", "executeAsyncScript", "executeAsyncScript"]
+
+
+def test_fill_verifies_values():
+    driver = FillingDriver({"//input[2]": ""})
+    page = Page(driver, _logger)
+    assert not page.fill([("//input[1]", "Jane"), ("//input[2]", "Doe")])
+
+
+class WaitingDriver(FakeDriver):
+    def __init__(self, found):
+        super().__init__()
+        self.found = found
+
+    def set_script_timeout(self, timeout):
+        self.execute("setTimeouts", {"script": timeout})
+
+    def execute_async_script(self, script, paths, timeout):
+        self.execute("executeAsyncScript", {"paths": paths})
+        return self.found
+
+
+def test_wait_resolves_alternatives():
+    driver = WaitingDriver(1)
+    page = Page(driver, _logger)
+    assert page.wait("//form", 3, alternatives=["//*[text()='Sold out']"], step="load") == "//*[text()='Sold out']"
+    assert page.timings[0][0] == "load"
+    assert "saved over polling" in page.breakdown()
+
+
+class ScriptlessDriver(WaitingDriver):
+    """A page where async scripts fail, so waits fall back to polling"""
+
+    def __init__(self, present):
+        super().__init__(-1)
+        self.present = present
+
+    def execute_async_script(self, script, paths, timeout):
+        raise WebDriverException("async scripts unsupported")
+
+    def find_elements_by_xpath(self, xpath):
+        return [FakeElement(self, xpath)] if xpath in self.present else []
+
+
+def test_wait_falls_back_to_polling():
+    page = Page(ScriptlessDriver({"//form"}), _logger)
+    assert page.wait("//form", 1, alternatives=["//*[text()='Sold out']"]) == "//form"
+    page = Page(ScriptlessDriver({"//*[text()='Sold out']"}), _logger)
+    assert page.wait("//form", 1, alternatives=["//*[text()='Sold out']"]) == "//*[text()='Sold out']"
+    with pytest.raises(TimeoutException):
+        Page(ScriptlessDriver(set()), _logger).wait("//form", 0.2)
+
+
+def test_wait_times_out():
+    page = Page(WaitingDriver(-1), _logger)
+    with pytest.raises(TimeoutException):
+        page.wait("//form", 1)
+    page.timeouts = {"load": 4}
+    assert page.timeout("load") == 4 and page.timeout("time", 1) == 1
@@ -0,0 +1,94 @@
+import logging
+
+from farquaad.base.location import Location
+from farquaad.base.prefetch import OPEN_SCRIPT, Prefetcher
+from farquaad.distributors import Distributor
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FakeDriver(object):
+    """Just the window handling of a WebDriver"""
+
+    def __init__(self):
+        self.windows = {"main": None}
+        self.current_window_handle = "main"
+        self.reloads = []
+        self.opened = 0
+        driver = self
+
+        class SwitchTo(object):
+            def window(self, handle):
+                assert handle in driver.windows
+                driver.current_window_handle = handle
+
+        self.switch_to = SwitchTo()
+
+    @property
+    def window_handles(self):
+        return list(self.windows)
+
+    def execute_script(self, script, *args):
+        if script == OPEN_SCRIPT:
+            self.opened += 1
+            self.windows[f"tab{self.opened}"] = args[0]
+        else:
+            self.reloads.append(self.windows[self.current_window_handle])
+
+    def close(self):
+        del self.windows[self.current_window_handle]
+
+
+def site(name):
+    return Location(name, url=f"https://example.com/{name}")
+
+
+def test_tabs_follow_the_ranking():
+    now = [0.0]
+    driver = FakeDriver()
+    prefetcher = Prefetcher(_logger, size=2, refresh=30, clock=lambda: now[0])
+    prefetcher.update(driver, [site("a"), site("b"), site("c"), site("d")])
+    # the first site is about to be booked, only the two behind it preload
+    assert sorted(driver.windows.values(), key=str) == [None, "https://example.com/b", "https://example.com/c"]
+
+    now[0] = 40.0
+    prefetcher.update(driver, [site("c"), site("d"), Location("no url")])
+    assert sorted(prefetcher.tabs) == ["https://example.com/c", "https://example.com/d"]
+    assert driver.reloads == [] and driver.current_window_handle == "main"
+    now[0] = 80.0
+    prefetcher.update(driver, [site("c"), site("d")])
+    assert driver.reloads == ["https://example.com/d"]
+
+    assert not prefetcher.claim(driver, site("a"))
+    assert prefetcher.claim(driver, site("c"))
+    assert driver.current_window_handle == "tab2" and "main" not in driver.windows
+    prefetcher.loaded(False, 3.0)
+    prefetcher.loaded(True, 0.5)
+    stats = prefetcher.stats()
+    assert stats["hits"] == 1 and stats["hitRate"] == 0.5 and stats["savedSeconds"] == 2.5
+    prefetcher.close()
+    assert list(driver.windows) == ["tab2"]
+
+
+class TabDistributor(Distributor):
+    """Stand-in booking through the prefetcher like HEB does"""
+
+    def __init__(self, driver):
+        super().__init__("tabs", driver, _logger)
+        self.prefetcher = Prefetcher(_logger, size=1)
+        self.warmed = []
+
+    def process(self, openSlot, patientData, race=None):
+        self.warmed.append(self.prefetcher.claim(self._driver, openSlot))
+        return openSlot.name == "c"
+
+
+def test_schedule_preloads_the_next_site():
+    distributor = TabDistributor(FakeDriver())
+    booked = distributor.schedule([site("a"), site("b"), site("c")], {})
+    assert booked.name == "c"
+    assert distributor.warmed == [False, True, True]
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from farquaad.base.recorder import FeedRecorder, readRecording
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def store(name, slots):
+    return {"name": name, "openTimeslots": slots, "latitude": 30.0, "longitude": -97.0}
+
+
+def test_deltas_round_trip(tmp_path):
+    path = str(tmp_path / "feed.jsonl.gz")
+    snapshots = [
+        [store("a", 1), store("b", 2)],
+        [store("a", 1), store("b", 3)],
+        [store("b", 3), store("c", 1)],
+        [store("b", 3), store("c", 1)],
+    ]
+    recorder = FeedRecorder(path, keyframe=3)
+    for at, snapshot in enumerate(snapshots):
+        recorder.record(snapshot, at=float(at))
+    recorder.close()
+
+    with gzip.open(path, "rt") as recording:
+        lines = [json.loads(line) for line in recording]
+    assert "full" in lines[0] and "full" in lines[3]
+    assert lines[1] == {"t": 1.0, "set": [store("b", 3)], "del": []}
+    assert lines[2]["del"] == ["a"]
+
+    replayed = list(readRecording(path))
+    assert [at for at, _ in replayed] == [0.0, 1.0, 2.0, 3.0]
+    for (_, locations), snapshot in zip(replayed, snapshots):
+        assert sorted(locations, key=lambda loc: loc["name"]) == snapshot
+
+
+def test_recordings_append(tmp_path):
+    path = str(tmp_path / "feed.jsonl.gz")
+    for at in range(2):
+        recorder = FeedRecorder(path)
+        recorder.record([store("a", at + 1)], at=float(at))
+        recorder.close()
+    assert [locations[0]["openTimeslots"] for _, locations in readRecording(path)] == [1, 2]
+
+
+def test_truncated_recording_reads_up_to_the_last_flush(tmp_path):
+    path = tmp_path / "feed.jsonl.gz"
+    recorder = FeedRecorder(str(path), keyframe=2)
+    for at in range(3):
+        recorder.record([store("a", at + 1)], at=float(at))
+    # what a killed run leaves behind: the third record was never flushed
+    killed = tmp_path / "killed.jsonl.gz"
+    killed.write_bytes(path.read_bytes())
+    recorder.close()
+    assert [at for at, _ in readRecording(str(killed))] == [0.0, 1.0]
+    assert [at for at, _ in readRecording(str(path))] == [0.0, 1.0, 2.0]
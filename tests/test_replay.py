@@ -0,0 +1,61 @@
+import logging
+
+from farquaad.base import Restrictions
+from farquaad.base.geocache import GeoCache
+from farquaad.base.recorder import FeedRecorder
+from farquaad.distributors.replay import Replay, ReplayDistributor
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+HOME = "Austin, TX"
+
+
+def store(name, latitude):
+    return {"name": name, "openTimeslots": 2, "latitude": latitude, "longitude": -97.7431, "city": "Austin", "zip": "78701"}
+
+
+def recording(path):
+    # "near" is open from 100s to 130s, "far" (~70 miles away) from 100s to 400s
+    recorder = FeedRecorder(path)
+    for at, snapshot in ((0, []), (100, [store("near", 30.3), store("far", 31.3)]), (130, [store("far", 31.3)]), (400, [])):
+        recorder.record(snapshot, at=float(at))
+    recorder.close()
+    return Replay(path)
+
+
+def distributor(tmp_path, replay, bookingSeconds):
+    cache = GeoCache(str(tmp_path))
+    cache.geocode(HOME, lambda address: (30.2672, -97.7431))
+    return ReplayDistributor(replay, _logger, bookingSeconds=bookingSeconds, cache=cache)
+
+
+def test_replay_clock(tmp_path):
+    replay = recording(str(tmp_path / "feed.jsonl.gz"))
+    replay.sleep(110)
+    assert replay.frame() == 1
+    assert replay.isOpen("near", 120) and not replay.isOpen("near", 140)
+    assert replay.openedAt("far") == 100.0
+    replay.sleep(300)
+    assert replay.done
+
+
+def test_simulated_bookings_depend_on_settings(tmp_path):
+    replay = recording(str(tmp_path / "feed.jsonl.gz"))
+    fast = distributor(tmp_path, replay, bookingSeconds=20)
+    result = fast.simulate(HOME, Restrictions(cities=None, zipcodes=None, distance=10), delay=5)
+    assert result["bookings"] >= 1 and fast.bookings[0][1] == "near"
+    assert result["maxLag"] <= 5
+
+    replay.rewind()
+    slow = distributor(tmp_path, replay, bookingSeconds=20)
+    result = slow.simulate(HOME, Restrictions(cities=None, zipcodes=None, distance=10), delay=60)
+    assert result["bookings"] == 0
+
+    replay.rewind()
+    wide = distributor(tmp_path, replay, bookingSeconds=20)
+    result = wide.simulate(HOME, Restrictions(cities=None, zipcodes=None, distance=100), delay=60, concurrency=2)
+    assert [name for _, name in wide.bookings][:1] == ["far"]
@@ -0,0 +1,43 @@
+from farquaad.base import Filter, Restrictions
+from farquaad.base.geocache import GeoCache
+from farquaad.base.location import Location
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def test_compiled_predicates():
+    compiled = Restrictions(cities=[" Austin", "ROUND ROCK"], zipcodes=["78701", "7866*", "773"], distance=5).compile()
+    assert compiled.cities == {"austin", "round rock"}
+    assert compiled.zipcodes == {"78701"} and compiled.prefixes == ("773", "7866")
+    assert compiled.admits("Austin", "78701-0001")
+    assert compiled.admits("Round Rock", "78664")
+    assert compiled.admits("austin", "77301")
+    assert not compiled.admits("Austin", "78702")
+    assert not compiled.admits("Houston", "78701")
+    unrestricted = Restrictions(cities=None, zipcodes=None, distance=None).compile()
+    assert unrestricted.admits("Anywhere", None) and unrestricted.zipKeys() is None
+
+
+def test_filter_remembers_verdicts(tmp_path):
+    cache = GeoCache(str(tmp_path))
+    cache.geocode("Austin, TX", lambda address: (30.2672, -97.7431))
+    refine = Filter("Austin, TX", Restrictions(cities=None, zipcodes=["787*"], distance=10), cache=cache)
+    near = Location("near", city="Austin", zip="78701", latitude=30.27, longitude=-97.74, openTimeslots=1)
+    far = Location("far", city="Austin", zip="78799", latitude=31.3, longitude=-97.74, openTimeslots=1)
+    elsewhere = Location("elsewhere", city="Houston", zip="77002", latitude=29.76, longitude=-95.37, openTimeslots=1)
+    feed = [far, near, elsewhere]
+    assert [loc.name for loc in refine.apply(feed)] == ["near"]
+    assert len(refine.verdicts) == 3 and refine.verdicts[("far", "Austin", "78799", 31.3, -97.74)] is None
+
+    judged = []
+    refine._judge = lambda loc: judged.append(loc) or None
+    refine.coordinates = lambda loc: judged.append(loc)
+    located = refine.apply(feed)
+    assert [(loc.name, round(loc.distance, 1)) for loc in located] == [("near", 0.3)]
+    assert refine.accept(near) == located[0].distance and judged == []
+    # a store that moved is judged again
+    assert refine.accept(Location("near", city="Austin", zip="78701", latitude=30.3)) is None
+    assert len(judged) == 1
+    cache.close()
@@ -0,0 +1,63 @@
+import pytest
+
+from farquaad.base.scheduler import AdaptiveScheduler, PollScheduler
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def test_fixed_schedule_stats():
+    scheduler = PollScheduler(10.0)
+    for changed in (True, False, False, False):
+        assert scheduler.next() == 10.0
+        scheduler.observe(changed)
+    stats = scheduler.stats()
+    assert stats["polls"] == 4 and stats["hits"] == 1
+    assert stats["hitRate"] == 0.25
+    assert stats["meanInterval"] == 10.0
+
+
+def test_mean_interval_past_the_kept_intervals():
+    scheduler = PollScheduler(2.0)
+    for _ in range(3000):
+        scheduler.next()
+    stats = scheduler.stats()
+    assert len(scheduler.intervals) == 1000
+    assert stats["meanInterval"] == pytest.approx(2.0)
+
+
+def test_adaptive_bursts_then_backs_off():
+    scheduler = AdaptiveScheduler(8.0, burstPolls=2, jitter=0.0, maxRate=None)
+    assert scheduler.next() == 8.0
+    scheduler.observe(True)
+    assert scheduler.next() == 2.0
+    scheduler.observe(False)
+    scheduler.observe(False)
+    assert scheduler.next() == 2.0
+    scheduler.observe(False)
+    assert scheduler.next() == 8.0
+    scheduler.observe(False)
+    assert scheduler.next() == 12.0
+    for _ in range(10):
+        scheduler.observe(False)
+    assert scheduler.next() == 24.0
+
+
+def test_adaptive_reacts_to_rising_slots_and_errors():
+    scheduler = AdaptiveScheduler(8.0, jitter=0.0, maxRate=None)
+    scheduler.observe(False, slots=3)
+    scheduler.observe(False, slots=5)
+    assert scheduler.next() == 2.0
+    scheduler.observe(False, status=429)
+    assert scheduler.next() == 24.0
+    assert scheduler.stats()["errors"] == 1
+
+
+def test_adaptive_respects_max_rate_and_jitter():
+    scheduler = AdaptiveScheduler(2.0, maxRate=0.25, jitter=0.2)
+    scheduler.observe(True)
+    assert scheduler.next() == 4.0
+    for _ in range(10):
+        scheduler.observe(False)
+    assert scheduler.next() == pytest.approx(6.0, rel=0.2)
@@ -0,0 +1,94 @@
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from farquaad.base.sharedfeed import SharedFeed
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class FakePoller(object):
+    """FeedPoller stand-in answering with queued bodies"""
+
+    def __init__(self, *bodies):
+        self.bodies = list(bodies)
+        self.polls = 0
+        self.status = None
+
+    def fetch(self):
+        self.polls += 1
+        self.status = 200
+        return self.bodies.pop(0) if self.bodies else None
+
+    def stream(self):
+        body = self.fetch()
+        if body:
+            yield body[:4]
+            yield body[4:]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "feed.shm")
+
+
+def test_one_instance_polls(path):
+    leader = SharedFeed(path, FakePoller(b'{"locations": [1]}', b'{"locations": [2]}'), _logger, capacity=8)
+    follower = SharedFeed(path, FakePoller(), _logger)
+    assert leader.leading and not follower.leading
+    assert follower.fetch() is None and follower.status is None
+
+    assert leader.fetch() == b'{"locations": [1]}'
+    assert follower.fetch() == b'{"locations": [1]}' and follower.status == 200
+    assert follower.fetch() is None
+    # the second body outgrows the initial capacity
+    assert b"".join(leader.stream()) == b'{"locations": [2]}'
+    assert b"".join(follower.stream()) == b'{"locations": [2]}'
+    assert follower._poller.polls == 0 and leader._poller.polls == 2
+    leader.close()
+    follower.close()
+
+
+def test_followers_wake_on_publish_and_take_over(path):
+    leader = SharedFeed(path, FakePoller(b"first"), _logger)
+    follower = SharedFeed(path, FakePoller(b"second"), _logger)
+    assert not follower.wait(0.1)
+    threading.Timer(0.1, leader.fetch).start()
+    started = time.monotonic()
+    assert follower.wait(5)
+    assert time.monotonic() - started < 1
+    assert follower.fetch() == b"first"
+
+    leader.close()
+    assert follower.fetch() == b"second" and follower.leading
+    follower.close()
+
+
+def test_shared_across_processes(path):
+    leader = SharedFeed(path, FakePoller(b"across"), _logger)
+    leader.fetch()
+    script = (
+        "import logging, sys; from farquaad.base.sharedfeed import SharedFeed; "
+        f"feed = SharedFeed({path!r}, None, logging.getLogger()); "
+        "sys.stdout.write(f'{feed.leading} {feed.fetch().decode()}')"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout == "False across"
+    leader.close()
+
+
+def test_distributors_import_without_fcntl():
+    # as on Windows: only --share-feed needs it
+    script = "import sys; sys.modules['fcntl'] = None; import farquaad.cli; from farquaad.distributors.heb import HEB"
+    subprocess.run([sys.executable, "-c", script], check=True)
@@ -0,0 +1,112 @@
+import datetime
+import logging
+
+from selenium.common.exceptions import TimeoutException
+
+from farquaad.base.slots import SlotPreferences, parseDate, parseTime
+from farquaad.distributors.hebforms import AppointmentForm
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+TODAY = datetime.date(2021, 3, 20)
+
+
+def options(*labels):
+    return [{"element": None, "value": label, "label": label} for label in labels]
+
+
+def test_labels():
+    assert parseDate("Mar 22", TODAY) == datetime.date(2021, 3, 22)
+    assert parseDate("Jan  4", datetime.date(2021, 12, 20)) == datetime.date(2022, 1, 4)
+    assert parseDate("Monday, March 22, 2021") == datetime.date(2021, 3, 22)
+    assert parseDate("03/22/2021") == datetime.date(2021, 3, 22)
+    assert parseDate("soon") is None
+    assert parseTime("9:15 AM - 9:30 AM") == datetime.time(9, 15)
+    assert parseTime("1:00pm") == datetime.time(13, 0)
+    assert parseTime("13:30") == datetime.time(13, 30)
+
+
+def test_ranking():
+    preferences = SlotPreferences.fromPatient(
+        {"manufacturer": "Pfizer", "notbefore": "03/23/2021", "timewindow": ["12:00", "17:00"]}, limit=2, today=TODAY
+    )
+    assert preferences.manufacturers == ["Pfizer"]
+    dates = preferences.rankDates(options("Mar 25", "Mar 22", "whenever", "Mar 24", "Mar 23"))
+    assert [d["label"] for d in dates] == ["Mar 23", "Mar 24"]
+    times = preferences.rankTimes(options("5:30 PM", "9:00 AM", "3:00 PM", "12:00 PM"))
+    assert [t["label"] for t in times] == ["12:00 PM", "3:00 PM"]
+    anything = SlotPreferences.fromPatient({}, today=TODAY)
+    assert anything.manufacturers == ["Any"]
+    assert [d["label"] for d in anything.rankDates(options("whenever", "Mar 22"))] == ["Mar 22", "whenever"]
+
+
+class FakeOption(object):
+    def __init__(self, form, combo, label):
+        self.form, self.combo, self.label = form, combo, label
+
+    def click(self):
+        self.form.clicks.append(self.label)
+        self.form.chosen[self.combo] = self.label
+
+
+class ScriptedForm(AppointmentForm):
+    """AppointmentForm over a scripted page: only 3:00 PM on Mar 23 can be booked"""
+
+    BOOKABLE = {("Mar 23", "3:00 PM")}
+
+    DATES = ["Mar 25", "Mar 23", "Mar 22", "Mar 24", "Mar 26"]
+    TIMES = ["9:00 AM", "9:15 AM", "1:00 PM", "3:00 PM"]
+
+    def __init__(self):
+        super().__init__(None, _logger, today=lambda: TODAY)
+        self.clicks = []
+        self.expansions = 0
+        self.chosen = {}
+
+    def expand(self, comboxpath, itemsxpath):
+        self.expansions += 1
+        if comboxpath == self.widgets["combo-manufacturer"]:
+            if itemsxpath != self.widgets["item-manufacturer"]["Moderna"]:
+                return []
+            return [{"element": FakeOption(self, "manufacturer", "Moderna"), "label": "Moderna"}]
+        combo, labels = ("date", self.DATES) if comboxpath == self.widgets["combo-date"] else ("time", self.TIMES)
+        return [{"element": FakeOption(self, combo, label), "value": label, "label": label} for label in labels]
+
+    def wait(self, waitxpath, waittime=10, alternatives=(), step=None):
+        if waitxpath == self.widgets["button-continue"] and (self.chosen.get("date"), self.chosen.get("time")) not in self.BOOKABLE:
+            raise TimeoutException(step)
+        return waitxpath
+
+
+def test_goes_straight_to_preferred_slots():
+    form = ScriptedForm()
+    patient = {"manufacturer": ["Pfizer", "Moderna"], "timewindow": ["12:00", "18:00"]}
+    assert form.select(patient)
+    assert form.clicks == ["Moderna", "Mar 22", "1:00 PM", "3:00 PM", "Mar 23", "1:00 PM", "3:00 PM"]
+    # Pfizer isn't offered; then one read of each combobox, plus reopening it for each fallback
+    assert form.expansions == 8
+
+
+def test_date_options_are_read_relative_to_today():
+    # six months on, the same labels are next year's and rank after "Jan 05"
+    form = ScriptedForm()
+    form._today = lambda: datetime.date(2021, 9, 22)
+    form.DATES = ["Mar 22", "Jan 05", "Mar 23"]
+    assert form.select({"manufacturer": "Moderna", "timewindow": ["12:00", "18:00"]})
+    assert form.clicks[:2] == ["Moderna", "Jan 05"]
+
+
+def test_taken_slot_is_not_picked_again():
+    form = ScriptedForm()
+    form.BOOKABLE = {("Mar 22", "1:00 PM"), ("Mar 22", "3:00 PM")}
+    patient = {"manufacturer": "Moderna", "timewindow": ["12:00", "18:00"]}
+    assert form.select(patient)
+    assert form.clicks == ["Moderna", "Mar 22", "1:00 PM"]
+    # 1:00 PM was taken before the patient form, the retry goes for the next best
+    form.clicks = []
+    assert form.select(patient)
+    assert form.clicks == ["Moderna", "Mar 22", "3:00 PM"]
@@ -0,0 +1,37 @@
+from farquaad.base.location import Location
+from farquaad.base.snapshot import CHANGED, CLOSED, OPENED, Ranking, Snapshot
+
+__author__ = "Jason Switzer"
+__copyright__ = "Jason Switzer"
+__license__ = "MIT"
+
+
+def loc(name, slots, distance=0):
+    return Location(name, openTimeslots=slots, distance=distance)
+
+
+def test_snapshot_delta():
+    snapshot = Snapshot()
+    changes = snapshot.update([loc("A", 1), loc("B", 2)])
+    assert sorted((c.kind, c.store) for c in changes) == [(OPENED, "A"), (OPENED, "B")]
+    assert snapshot.update([loc("A", 1), loc("B", 2)]) == []
+    changes = snapshot.update([loc("B", 5), loc("C", 1)])
+    assert sorted((c.kind, c.store, c.slots) for c in changes) == [
+        (CHANGED, "B", 5),
+        (CLOSED, "A", 0),
+        (OPENED, "C", 1),
+    ]
+    assert "A" not in snapshot and len(snapshot) == 2
+
+
+def test_ranking_order():
+    ranking = Ranking()
+    ranking.put("far", loc("far", 1, 30.0))
+    ranking.put("near", loc("near", 1, 2.0))
+    ranking.put("mid", loc("mid", 1, 10.0))
+    assert [x["name"] for x in ranking.list()] == ["near", "mid", "far"]
+    ranking.put("far", loc("far", 1, 1.0))
+    assert [x["name"] for x in ranking.list()] == ["far", "near", "mid"]
+    assert ranking.remove("near")["name"] == "near"
+    assert ranking.remove("near") is None
+    assert len(ranking) == 2